@@ -1,6 +1,6 @@
 // client/src/context/AuthContext.jsx
 import React, { createContext, useState, useEffect } from 'react';
-import { loginRequest } from '../services/api';
+import { loginRequest, refreshRequest, logoutRequest } from '../services/api';
 
 // copy your decode helper
 function decodeToken(token) {
@@ -14,37 +14,67 @@ function decodeToken(token) {
   }
 }
 
+// the subject is the user id; the role rides along as its own claim
+function userFromToken(token) {
+  const decoded = token && decodeToken(token);
+  return decoded?.sub ? { id: Number(decoded.sub), role: decoded.role } : null;
+}
+
 export const AuthContext = createContext();
 
 export function AuthProvider({ children }) {
   
   const [token, setToken] = useState(() => localStorage.getItem('token'));
-  const [user,  setUser]  = useState(() => {
-    const t = localStorage.getItem('token');
-    const decoded = t && decodeToken(t);
-    return decoded?.sub || null;
-  });
+  const [refreshToken, setRefreshToken] = useState(() => localStorage.getItem('refreshToken'));
+  const [user,  setUser]  = useState(() => userFromToken(localStorage.getItem('token')));
 
   
   useEffect(() => {
     if (token) {
       localStorage.setItem('token', token);
-      const decoded = decodeToken(token);
-      setUser(decoded?.sub || null);
+      setUser(userFromToken(token));
     } else {
       localStorage.removeItem('token');
       setUser(null);
     }
   }, [token]);
 
+  useEffect(() => {
+    if (refreshToken) {
+      localStorage.setItem('refreshToken', refreshToken);
+    } else {
+      localStorage.removeItem('refreshToken');
+    }
+  }, [refreshToken]);
+
+  // access tokens are short-lived: swap for a new one a minute before expiry
+  useEffect(() => {
+    if (!token || !refreshToken) return;
+    const exp = decodeToken(token)?.exp;
+    if (!exp) return;
+    const delay = Math.max(0, exp * 1000 - Date.now() - 60 * 1000);
+    const timer = setTimeout(async () => {
+      try {
+        setToken(await refreshRequest(refreshToken));
+      } catch {
+        setToken(null);
+        setRefreshToken(null);
+      }
+    }, delay);
+    return () => clearTimeout(timer);
+  }, [token, refreshToken]);
+
   const login = async (email, password) => {
-    const jwt = await loginRequest(email, password);
-    setToken(jwt);
-    return jwt;
+    const tokens = await loginRequest(email, password);
+    setToken(tokens.accessToken);
+    setRefreshToken(tokens.refreshToken);
+    return tokens.accessToken;
   };
 
   const logout = () => {
+    if (token) logoutRequest(token, refreshToken);
     setToken(null);
+    setRefreshToken(null);
     setUser(null);
   };
 
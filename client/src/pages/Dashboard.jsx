@@ -14,24 +14,19 @@ export default function Dashboard() {
   const { token } = useContext(AuthContext);
   const headers = { Authorization: `Bearer ${token}` };
 
-  const [requisitions, setRequisitions] = useState([]);
-  const [lpos, setLpos] = useState([]);
+  const [stats, setStats] = useState(null);
 
   useEffect(() => {
-    // load user's requisitions
-    axios.get('http://localhost:5000/requisitions', { headers })
-      .then(res => setRequisitions(res.data))
-      .catch(err => console.error('Failed loading requisitions', err));
-
-    // load user's LPOs
-    axios.get('http://localhost:5000/lpos', { headers })
-      .then(res => setLpos(res.data))
-      .catch(err => console.error('Failed loading LPOs', err));
+    // KPI counts are aggregated server-side for the current user
+    axios.get('http://localhost:5000/stats', { headers })
+      .then(res => setStats(res.data))
+      .catch(err => console.error('Failed loading stats', err));
   }, [token]);
 
-  const pendingCount = requisitions.filter(r => r.status === 'pending').length;
-  const approvedCount = requisitions.filter(r => r.status === 'approved').length;
-  const lpoCount = lpos.length;
+  const byStatus = stats?.requisitions.by_status ?? {};
+  const pendingCount = byStatus.pending ?? 0;
+  const approvedCount = byStatus.approved ?? 0;
+  const lpoCount = stats?.lpos.total ?? 0;
 
   return (
     <div className="p-6 space-y-8">
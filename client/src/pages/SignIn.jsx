@@ -33,9 +33,9 @@ export default function SignIn() {
       const jwt = await login(email, password);
       toast.success('Logged in!');
 
-      // extract the 'sub' claim
+      // extract the 'role' claim
       const decoded = decodeToken(jwt);
-      const role    = decoded?.sub?.role;
+      const role    = decoded?.role;
 
       // route based on role
       if (role === 'admin') {
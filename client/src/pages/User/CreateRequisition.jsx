@@ -11,21 +11,64 @@ export default function CreateRequisition() {
   const navigate = useNavigate();
 
   const [products,  setProducts]  = useState([]);
+  const [known,     setKnown]     = useState({});
+  const [query,     setQuery]     = useState('');
+  const [cursor,    setCursor]    = useState(null);  // next catalogue page, if any
   const [lines,     setLines]     = useState([{ product_id: '', quantity: 1 }]);
   const [notes,     setNotes]     = useState('');
 
+  const remember = list =>
+    // remember every product seen so chosen lines keep their names
+    setKnown(k => ({ ...k, ...Object.fromEntries(list.map(p => [p.id, p])) }));
+
+  const fetchPage = after =>
+    axios.get('http://localhost:5000/products', {
+      params: after ? { limit: 50, cursor: after } : { limit: 50 }
+    }).then(res => res.data);
+
+  // first page of the catalogue, or the server-side search results
   useEffect(() => {
-    axios
-      .get('http://localhost:5000/products', { headers })
-      .then(res => {
-        // ensure we only set arrays
-        setProducts(Array.isArray(res.data) ? res.data : []);
+    const q = query.trim();
+    const timer = setTimeout(() => {
+      const request = q
+        ? axios.get('http://localhost:5000/search', {
+            headers,
+            params: { q, type: 'products', limit: 50 }
+          }).then(res => ({ items: res.data.products, next_cursor: null }))
+        : fetchPage(null);
+      request
+        .then(({ items, next_cursor }) => {
+          const list = Array.isArray(items) ? items : [];
+          setProducts(list);
+          setCursor(next_cursor || null);
+          remember(list);
+        })
+        .catch(() => {
+          toast.error('Failed to load products');
+          setProducts([]);
+          setCursor(null);
+        });
+    }, q ? 250 : 0);
+    return () => clearTimeout(timer);
+  }, [token, query]);
+
+  // the catalogue is paged: append the next 50 to the picker
+  const loadMore = () =>
+    fetchPage(cursor)
+      .then(({ items, next_cursor }) => {
+        const list = Array.isArray(items) ? items : [];
+        setProducts(ps => [...ps, ...list]);
+        setCursor(next_cursor || null);
+        remember(list);
       })
-      .catch(() => {
-        toast.error('Failed to load products');
-        setProducts([]);
-      });
-  }, [token]);
+      .catch(() => toast.error('Failed to load products'));
+
+  const optionsFor = productId => {
+    const chosen = known[productId];
+    return chosen && !products.some(p => p.id === chosen.id)
+      ? [chosen, ...products]
+      : products;
+  };
 
   const addLine = () =>
     setLines(ls => [...ls, { product_id: '', quantity: 1 }]);
@@ -71,6 +114,27 @@ export default function CreateRequisition() {
       <h1 className="text-2xl font-bold mb-6">Create Requisition</h1>
       <form onSubmit={handleSubmit} className="space-y-6">
 
+        <input
+          type="search"
+          value={query}
+          onChange={e => setQuery(e.target.value)}
+          className="w-full border rounded px-3 py-2"
+          placeholder="Search products…"
+        />
+        {cursor && (
+          <p className="text-sm text-gray-600">
+            Showing the first {products.length} products; search, or{' '}
+            <button
+              type="button"
+              onClick={loadMore}
+              className="text-blue-600 hover:text-blue-800 underline"
+            >
+              load more
+            </button>
+            .
+          </p>
+        )}
+
         {lines.map((l, i) => (
           <div key={i} className="grid grid-cols-12 gap-4 items-center">
             <select
@@ -80,7 +144,7 @@ export default function CreateRequisition() {
               className="col-span-6 border rounded px-3 py-2"
             >
               <option value="">Select product…</option>
-              {products.map(p => (
+              {optionsFor(l.product_id).map(p => (
                 <option key={p.id} value={p.id}>
                   {p.name}
                 </option>
@@ -8,21 +8,13 @@ export default function UserLpos() {
   const headers = { Authorization: `Bearer ${token}` };
 
   const [lpos, setLpos] = useState([]);
-  const [suppliers, setSuppliers] = useState({});
   const [openId, setOpenId] = useState(null);
 
   useEffect(() => {
-    Promise.all([
-      axios.get('http://localhost:5000/lpos', { headers }),
-      axios.get('http://localhost:5000/suppliers')
-    ])
-      .then(([lres, sres]) => {
-        setLpos(lres.data);
-        // map supplierId → name
-        const map = Object.fromEntries(sres.data.map(s => [s.id, s.name]));
-        setSuppliers(map);
-      })
-      .catch(() => toast.error('Failed to load LPOs/suppliers'));
+    // supplier names come embedded, so no separate /suppliers call
+    axios.get('http://localhost:5000/lpos?expand=supplier', { headers })
+      .then(res => setLpos(res.data))
+      .catch(() => toast.error('Failed to load LPOs'));
   }, [token]);
 
   const toggle = id => setOpenId(openId === id ? null : id);
@@ -43,7 +35,7 @@ export default function UserLpos() {
                 <div>
                   <span className="font-medium">LPO #{l.id}</span> — Req #{l.requisition_id}
                 </div>
-                <div className="text-sm text-gray-700">{suppliers[l.supplier_id]}</div>
+                <div className="text-sm text-gray-700">{l.supplier_name}</div>
               </button>
               {openId === l.id && (
                 <div className="p-5 bg-white space-y-2">
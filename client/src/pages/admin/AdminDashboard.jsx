@@ -17,32 +17,22 @@ export default function AdminDashboard() {
   useEffect(() => {
     const headers = { Authorization: `Bearer ${token}` };
 
-    // 1) Total requisitions + pending count + recent
-    axios.get('http://localhost:5000/requisitions', { headers })
+    // 1) KPI counts, aggregated server-side
+    axios.get('http://localhost:5000/stats', { headers })
       .then(res => {
-        const all = res.data.length;
-        const pending = res.data.filter(x => x.status === 'pending').length;
-        setCounts(c => ({ ...c, allReqs: all, pendingReqs: pending }));
-
-        const sorted = [...res.data].sort(
-          (a, b) => new Date(b.created_at) - new Date(a.created_at)
-        );
-        setRecentReqs(sorted.slice(0, 5));
+        const { requisitions, lpos, users } = res.data;
+        setCounts({
+          users: users.total,
+          allReqs: requisitions.total,
+          pendingReqs: requisitions.by_status.pending ?? 0,
+          lpos: lpos.total,
+        });
       })
       .catch(console.error);
 
-    // 2) Total LPOs
-    axios.get('http://localhost:5000/lpos', { headers })
-      .then(res => {
-        setCounts(c => ({ ...c, lpos: res.data.length }));
-      })
-      .catch(console.error);
-
-    // 3) Total users
-    axios.get('http://localhost:5000/users', { headers })
-      .then(res => {
-        setCounts(c => ({ ...c, users: res.data.length }));
-      })
+    // 2) Five most recent requisitions
+    axios.get('http://localhost:5000/requisitions?limit=5', { headers })
+      .then(res => setRecentReqs(res.data.items))
       .catch(console.error);
   }, [token]);
 
@@ -100,7 +100,12 @@ export default function CreateLpo() {
     try {
       await axios.post(
         `${API}/lpos`,
-        { requisition_id: selected.id, supplier_id: supplierId, total_value: total },
+        // unit prices only; the server prices each line and derives the total
+        {
+          requisition_id: selected.id,
+          supplier_id: supplierId,
+          prices: Object.fromEntries(rows.map(r => [r.id, r.price])),
+        },
         { headers }
       );
       toast.success('LPO created!');
@@ -14,7 +14,7 @@ export default function ViewLpos() {
   // fetch all LPOs
   const load = () => {
     axios
-      .get('http://localhost:5000/lpos', { headers })
+      .get('http://localhost:5000/lpos?expand=supplier,products', { headers })
       .then(res => setLpos(res.data))
       .catch(() => toast.error('Error fetching LPOs'));
   };
@@ -22,14 +22,23 @@ export default function ViewLpos() {
 
   const toggle = id => setOpenId(openId === id ? null : id);
 
-  const updateStatus = (id, status) => {
+  // `version` is what this list showed; if someone changed the LPO since,
+  // the server answers 409/412 instead of overwriting their change
+  const updateStatus = (id, status, version) => {
     axios
-      .put(`http://localhost:5000/lpos/${id}`, { status }, { headers })
+      .put(`http://localhost:5000/lpos/${id}`, { status, version }, { headers })
       .then(() => {
         toast.success(`LPO #${id} marked ${status}!`);
         load();
       })
-      .catch(() => toast.error('Failed to update status'));
+      .catch(err => {
+        if ([409, 412].includes(err.response?.status)) {
+          toast.warn(`${err.response.data.error} (now ${err.response.data.status})`);
+          load();
+        } else {
+          toast.error('Failed to update status');
+        }
+      });
   };
 
   // group by status
@@ -109,13 +118,13 @@ export default function ViewLpos() {
                       {l.status === 'pending' && (
                         <>
                           <button
-                            onClick={() => updateStatus(l.id, 'delivered')}
+                            onClick={() => updateStatus(l.id, 'delivered', l.version)}
                             className="flex-1 bg-green-600 hover:bg-green-700 text-white py-2 rounded"
                           >
                             Mark Delivered
                           </button>
                           <button
-                            onClick={() => updateStatus(l.id, 'not_delivered')}
+                            onClick={() => updateStatus(l.id, 'not_delivered', l.version)}
                             className="flex-1 bg-red-600 hover:bg-red-700 text-white py-2 rounded"
                           >
                             Mark Not Delivered
@@ -124,7 +133,7 @@ export default function ViewLpos() {
                       )}
                       {l.status === 'delivered' && (
                         <button
-                          onClick={() => updateStatus(l.id, 'not_delivered')}
+                          onClick={() => updateStatus(l.id, 'not_delivered', l.version)}
                           className="flex-1 bg-red-600 hover:bg-red-700 text-white py-2 rounded"
                         >
                           Mark Not Delivered
@@ -132,7 +141,7 @@ export default function ViewLpos() {
                       )}
                       {l.status === 'not_delivered' && (
                         <button
-                          onClick={() => updateStatus(l.id, 'delivered')}
+                          onClick={() => updateStatus(l.id, 'delivered', l.version)}
                           className="flex-1 bg-green-600 hover:bg-green-700 text-white py-2 rounded"
                         >
                           Mark Delivered
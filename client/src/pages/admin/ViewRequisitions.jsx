@@ -22,17 +22,43 @@ export default function ViewRequisitions() {
 
   const toggle = id => setOpenId(openId === id ? null : id);
 
-  const updateStatus = (id, status) => {
+  // `version` is what this list showed; if another admin changed the
+  // requisition since, the server answers 409/412 instead of overwriting
+  const updateStatus = (id, status, version) => {
     axios
       .put(
         `http://localhost:5000/requisitions/${id}`,
-        { status },
+        { status, version },
         { headers }
       )
       .then(() => {
         toast.success(`Requisition #${id} ${status}!`);
         load();
       })
+      .catch(err => {
+        if ([409, 412].includes(err.response?.status)) {
+          toast.warn(`${err.response.data.error} (now ${err.response.data.status})`);
+          load();
+        } else {
+          toast.error('Failed to update status');
+        }
+      });
+  };
+
+  // one request for the whole pending list instead of one per requisition
+  const bulkUpdateStatus = (ids, status) => {
+    axios
+      .put(
+        'http://localhost:5000/requisitions/status',
+        { ids, status },
+        { headers }
+      )
+      .then(res => {
+        const skipped = res.data.results.length - res.data.updated;
+        toast.success(`${res.data.updated} requisition(s) ${status}`);
+        if (skipped) toast.warn(`${skipped} skipped (already changed)`);
+        load();
+      })
       .catch(() => toast.error('Failed to update status'));
   };
 
@@ -116,13 +142,13 @@ export default function ViewRequisitions() {
                     {req.status === 'pending' && (
                       <div className="pt-4 border-t flex space-x-2">
                         <button
-                          onClick={() => updateStatus(req.id, 'approved')}
+                          onClick={() => updateStatus(req.id, 'approved', req.version)}
                           className="flex-1 bg-green-600 hover:bg-green-700 text-white py-2 rounded"
                         >
                           Approve
                         </button>
                         <button
-                          onClick={() => updateStatus(req.id, 'rejected')}
+                          onClick={() => updateStatus(req.id, 'rejected', req.version)}
                           className="flex-1 bg-red-600 hover:bg-red-700 text-white py-2 rounded"
                         >
                           Reject
@@ -144,6 +170,22 @@ export default function ViewRequisitions() {
       <h1 className="text-3xl font-bold mb-6 text-gray-800">
         Manage Requisitions
       </h1>
+      {pending.length > 1 && (
+        <div className="flex space-x-2">
+          <button
+            onClick={() => bulkUpdateStatus(pending.map(r => r.id), 'approved')}
+            className="bg-green-600 hover:bg-green-700 text-white px-4 py-2 rounded"
+          >
+            Approve all pending ({pending.length})
+          </button>
+          <button
+            onClick={() => bulkUpdateStatus(pending.map(r => r.id), 'rejected')}
+            className="bg-red-600 hover:bg-red-700 text-white px-4 py-2 rounded"
+          >
+            Reject all pending
+          </button>
+        </div>
+      )}
       {renderSection('🕒 Pending', pending)}
       {renderSection('✅ Approved', approved)}
       {renderSection('❌ Rejected', rejected)}
@@ -14,6 +14,32 @@ export async function loginRequest(email, password) {
     throw new Error(err.error || 'Login failed');
   }
 
+  const { access_token, refresh_token } = await res.json();
+  return { accessToken: access_token, refreshToken: refresh_token };
+}
+
+export async function refreshRequest(refreshToken) {
+  const res = await fetch(`${API_BASE}/token/refresh`, {
+    method: 'POST',
+    headers: { Authorization: `Bearer ${refreshToken}` }
+  });
+
+  if (!res.ok) {
+    throw new Error('Session expired');
+  }
+
   const { access_token } = await res.json();
   return access_token;
 }
+
+export async function logoutRequest(accessToken, refreshToken) {
+  // best effort: the tokens are dropped locally either way
+  await fetch(`${API_BASE}/logout`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Authorization: `Bearer ${accessToken}`
+    },
+    body: JSON.stringify({ refresh_token: refreshToken })
+  }).catch(() => {});
+}
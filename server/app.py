@@ -1,101 +1,212 @@
-from flask import Flask, request, jsonify
+import click
+import json
+import re
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from models import db, User, Product, Supplier, Requisition, LPO, RequisitionStatus, LPOStatus,RequisitionProduct
+from models import db, User, Product, Supplier, Requisition, LPO, RequisitionStatus, LPOStatus,RequisitionProduct, LPOProduct, REQUISITION_TRANSITIONS, LPO_TRANSITIONS, Job, JobStatus
 from config import Config
-from sqlalchemy.exc import IntegrityError
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from database import init_engine
+from serializers import (requisition_load_options, serialize_requisition, serialize_lpo,
+                         lpo_load_options, parse_expand, requisition_list_rows, lpo_list_rows,
+                         serialize_requisition_rows, serialize_lpo_rows,
+                         serialize_user, serialize_product, serialize_supplier, serialize_job)
+from stats import get_stats
+from exports import (FORMATS, REQUISITION_COLUMNS, LPO_COLUMNS, requisition_rows, lpo_rows,
+                     csv_lines, requisition_ndjson, lpo_ndjson)
+from http_cache import cached_collection_response
+from cache import init_cache, get_cache, cached_json_response
+from metrics import init_metrics, metrics_response
+from json_provider import init_json
+from compression import init_compression
+from streaming import json_list
+from jobs import Worker, enqueue, parse_bulk_seed_options
+from seed import BULK_SEED_DEFAULTS as SEED_DEFAULTS, bulk_seed
+from concurrency import WriteConflict, compare_and_swap, expected_version, lock_row
+from search import INDEXES, SearchUnavailable, include_name, rebuild, search_ids, terms
+from rollups import (add_lpos, contribution, replace_lpos, rebuild as rebuild_rollups, check as check_rollups,
+                     spend_by_month, spend_by_product, spend_by_status, spend_by_supplier)
+from auth import (init_auth, auth_required, admin_required, current_identity,
+                  issue_access_token, issue_refresh_token, revoke_current_token,
+                  revoke_encoded_token, revoke_all_tokens)
+from user_import import parse_user_rows, job_rows, MAX_IMPORT_ROWS
+from security import verify_password, login_throttle, shutdown_hash_pool, HashPoolBusy
+from pagination import (PaginationError, wants_page, keyset_page, page_envelope,
+                        parse_date_range, parse_int_arg, parse_limit)
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from flask_jwt_extended import jwt_required
 from flask_cors import CORS
 
 
-app = Flask(__name__)
-CORS(app)  # To allow frontend requests
-CORS(app, origins=["http://127.0.0.1:5174"])
+migrate = Migrate()
+api = Blueprint('api', __name__, cli_group=None)
 
-app.config.from_object(Config)
-db.init_app(app)
-migrate = Migrate(app, db)
-jwt = JWTManager(app)
 
+def create_app(config=Config):
+    app = Flask(__name__)
+    app.config.from_object(config)
+    CORS(app, origins=app.config['CORS_ORIGINS'])
+    init_json(app)
 
-@app.route('/')
+    db.init_app(app)
+    init_engine(app)
+    init_cache(app)
+    init_metrics(app)
+    init_compression(app)
+    migrate.init_app(app, db, include_name=include_name)
+    init_auth(app)
+
+    app.register_blueprint(api)
+    return app
+
+
+def shutdown(app):
+    """Release process-wide resources; called by gunicorn as a worker exits."""
+    shutdown_hash_pool()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@api.route('/')
 def index():
     return jsonify({"message": "Welcome to the LPO Tracker API!"})
 
 
-@app.route('/login', methods=['POST'])
+@api.route('/healthz')
+def healthz():
+    # liveness + readiness for load balancers: the worker answers and can reach the database
+    try:
+        db.session.execute(text('SELECT 1'))
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'status': 'unavailable', 'database': str(e.__cause__ or e)}), 503
+    return jsonify({'status': 'ok'})
+
+
+@api.route('/login', methods=['POST'])
 def login():
+    retry_after = login_throttle().hit(request.remote_addr)
+    if retry_after:
+        resp = jsonify({'error': 'Too many login attempts'})
+        resp.headers['Retry-After'] = str(int(retry_after) + 1)
+        return resp, 429
+
     data = request.get_json() or {}
     email = data.get('email')
     password = data.get('password')
     if not email or not password:
         return jsonify({'error': 'Email and password required'}), 400
 
-    user = User.query.filter_by(email=email).first()
-    if not user or not user.check_password(password):
+    user = User.query.filter_by(email=email.strip().lower()).first()
+    try:
+        ok = user is not None and verify_password(user, password)
+    except HashPoolBusy:
+        resp = jsonify({'error': 'Server busy, try again'})
+        resp.headers['Retry-After'] = '1'
+        return resp, 503
+    if not ok:
         return jsonify({'error': 'Bad credentials'}), 401
+    if not user.is_active:
+        return jsonify({'error': 'Account disabled'}), 403
 
-   
-    token = create_access_token(identity={'id': user.id, 'role': user.role})
-    return jsonify({'access_token': token}), 200
+    # verify_password upgrades hashes made under an older policy
+    if db.session.dirty:
+        db.session.commit()
 
-@app.route('/users', methods=['POST'])
-@jwt_required()
-def create_user():
-    current = get_jwt_identity()
-    if current['role'] != 'admin':
-        return jsonify({'error': 'Admins only'}), 403
+    principal = {'id': user.id, 'role': user.role}
+    return jsonify({
+        'access_token': issue_access_token(principal),
+        'refresh_token': issue_refresh_token(principal),
+    }), 200
 
+@api.route('/token/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh_token():
+    # new access token without re-checking the password; picks up role changes
+    return jsonify({'access_token': issue_access_token(current_identity())}), 200
+
+@api.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    # revokes the presented token, plus a refresh_token sent in the body
+    refresh = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh:
+        try:
+            revoke_encoded_token(refresh, current_identity()['id'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    revoke_current_token()
+    db.session.commit()
+    return jsonify({'message': 'Logged out'}), 200
+
+@api.route('/users', methods=['POST'])
+@admin_required
+def create_user():
     data = request.get_json() or {}
     for fld in ('name','email','password','role'):
         if fld not in data:
             return jsonify({'error': f"{fld} is required"}), 400
 
-    if User.query.filter_by(email=data['email']).first():
-        return jsonify({'error': 'Email already in use'}), 400
-
-    user = User(
-        name=data['name'],
-        email=data['email'],
-        password_hash=data['password'],  # will hash via model validator
-        role=data['role']
-    )
+    # no pre-check SELECT: the unique index on lower(email) decides
+    try:
+        user = User(
+            name=data['name'],
+            email=data['email'],
+            password_hash=data['password'],  # will hash via model validator
+            role=data['role']
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     db.session.add(user)
-    db.session.commit()
-    return jsonify({
-        'id':    user.id,
-       'name':  user.name,
-       'email': user.email,
-       'role':  user.role
-
-       
-}), 201
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Email already in use'}), 400
+    return jsonify(serialize_user(user)), 201
 
-@app.route('/users', methods=['GET'])
-@jwt_required()
+@api.route('/users/import', methods=['POST'])
+@admin_required
+def import_users():
+    try:
+        rows = parse_user_rows(request)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not rows:
+        return jsonify({'error': 'No users to import'}), 400
+    if len(rows) > MAX_IMPORT_ROWS:
+        return jsonify({'error': f'At most {MAX_IMPORT_ROWS} users per import'}), 400
+
+    # passwords are hashed here (cheaply, see job_rows) so only hashes are queued;
+    # the inserts run in a job worker
+    job = enqueue('import_users', {'rows': job_rows(rows)}, current_identity()['id'])
+    return accepted(job)
+
+@api.route('/users', methods=['GET'])
+@admin_required
 def list_users():
-    current = get_jwt_identity()
-    if current['role'] != 'admin':
-        return jsonify({'error': 'Admins only'}), 403
+    query = User.query
+    role = request.args.get('role')
+    if role:
+        query = query.filter_by(role=role)
 
-    all_users = User.query.all()
-    return jsonify([{
-        'id':    u.id,
-        'name':  u.name,
-        'email': u.email,
-        'role':  u.role
-    } for u in all_users]), 200
+    if wants_page(request.args):
+        try:
+            rows, next_cursor = keyset_page(query, [(User.id, False)], request.args)
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(page_envelope([serialize_user(u) for u in rows], next_cursor)), 200
 
+    return jsonify([serialize_user(u) for u in query.all()]), 200
 
 
 
-@app.route('/users/<int:user_id>/password', methods=['PUT'])
-@jwt_required()
-def reset_password(user_id):
-    current = get_jwt_identity()
-    if current['role'] != 'admin':
-        return jsonify({'error':'Admins only'}), 403
 
+@api.route('/users/<int:user_id>/password', methods=['PUT'])
+@admin_required
+def reset_password(user_id):
     data = request.get_json() or {}
     new_pwd = data.get('password')
     if not new_pwd:
@@ -103,24 +214,30 @@ def reset_password(user_id):
 
     user = User.query.get_or_404(user_id)
     user.password_hash = new_pwd   # hashed via validator
+    revoke_all_tokens(user)        # sessions using the old password end now
     db.session.commit()
     return jsonify({'message':'Password reset successful'}), 200
 
-@app.route('/users/<int:user_id>', methods=['PUT'])
-@jwt_required()
+@api.route('/users/<int:user_id>', methods=['PUT'])
+@admin_required
 def update_user(user_id):
-    current = get_jwt_identity()
-    if current['role'] != 'admin':
-        return jsonify({'error': 'Admins only'}), 403
-
     data = request.get_json() or {}
     user = User.query.get_or_404(user_id)
 
     # Update only the fields the admin sent
     user.name  = data.get('name', user.name)
-    user.email = data.get('email', user.email)
+    try:
+        user.email = data.get('email', user.email)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     if 'role' in data:
         user.role = data['role']
+    if 'active' in data:
+        if not isinstance(data['active'], bool):
+            return jsonify({'error': 'active must be true or false'}), 400
+        if user.is_active and not data['active']:
+            revoke_all_tokens(user)
+        user.is_active = data['active']
 
     try:
         db.session.commit()
@@ -128,21 +245,20 @@ def update_user(user_id):
         db.session.rollback()
         return jsonify({'error': 'Email already in use.'}), 400
 
-    return jsonify({
-        'id':    user.id,
-        'name':  user.name,
-        'email': user.email,
-        'role':  user.role
-    }), 200
+    return jsonify(serialize_user(user)), 200
 
 # ------------------- REQUISITIONS -------------------
 
 # in app.py
 
-@app.route('/requisitions', methods=['GET'])
-@jwt_required()
+@api.route('/requisitions', methods=['GET'])
+@auth_required
 def get_requisitions():
-    current = get_jwt_identity()
+    current = current_identity()
+    scope = 'admin' if current['role'] == 'admin' else f"user:{current['id']}"
+    return cached_json_response('requisitions', scope, lambda: list_requisitions(current))
+
+def list_requisitions(current):
     query = Requisition.query
     # non-admins only see their own
     if current['role'] != 'admin':
@@ -155,115 +271,219 @@ def get_requisitions():
         except ValueError:
             return jsonify({"error": "Invalid status filter."}), 400
 
-    out = []
-    for r in query.order_by(Requisition.created_at.desc()).all():
-        # fetch user name
-        usr = User.query.get(r.user_id)
-        # build product list
-        prods = []
-        for rp in r.products:  # rp is RequisitionProduct
-            p = Product.query.get(rp.product_id)
-            prods.append({
-                'id':       p.id,
-                'name':     p.name,
-                'quantity': rp.quantity,
-                'price':    p.price
-            })
-        out.append({
-            'id':         r.id,
-            'user_id':    r.user_id,
-            'user_name':  usr.name,
-            'status':     r.status.value,
-            'created_at': r.created_at.isoformat(),
-            'notes':      r.notes or '',
-            'products':   prods
-        })
-    return jsonify(out), 200
+    try:
+        user_id = parse_int_arg(request.args, 'user_id')
+        if user_id is not None and current['role'] == 'admin':
+            query = query.filter_by(user_id=user_id)
+        query = query.filter(*parse_date_range(request.args, Requisition.created_at))
+
+        # column tuples rather than ORM objects; see serializers.py
+        rows = requisition_list_rows(query)
+        if wants_page(request.args):
+            keys = [(Requisition.created_at, True), (Requisition.id, True)]
+            rows, next_cursor = keyset_page(rows, keys, request.args)
+            return page_envelope(serialize_requisition_rows(rows), next_cursor)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return json_list(rows.order_by(Requisition.created_at.desc()), serialize_requisition_rows)
 
 from collections import Counter
 
-@app.route('/requisitions', methods=['POST'])
-@jwt_required()
+def requested_quantities(data):
+    """Merge `product_ids` (one entry per unit) and `items` ({product_id, quantity}) into a Counter."""
+    counts = Counter()
+    for pid in data.get('product_ids') or []:
+        if not isinstance(pid, int) or isinstance(pid, bool):
+            raise ValueError(f'Invalid product id: {pid!r}')
+        counts[pid] += 1
+    for item in data.get('items') or []:
+        pid = item.get('product_id') if isinstance(item, dict) else None
+        qty = item.get('quantity', 1) if isinstance(item, dict) else None
+        if not isinstance(pid, int) or isinstance(pid, bool):
+            raise ValueError(f'Invalid product id: {pid!r}')
+        if not isinstance(qty, int) or isinstance(qty, bool) or qty < 1:
+            raise ValueError(f'Invalid quantity for product {pid}')
+        counts[pid] += qty
+    return counts
+
+@api.route('/requisitions', methods=['POST'])
+@auth_required
 def create_requisition():
-    current = get_jwt_identity()
+    current = current_identity()
     data = request.get_json() or {}
+    # new requisitions start pending; only the status transitions move them on
+    if 'status' in data:
+        return jsonify({'error': 'status cannot be set on create; requisitions start pending'}), 400
 
     try:
-        # 1) Create the requisition
+        counts = requested_quantities(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # validate every product id with a single IN query
+    if counts:
+        found = {pid for (pid,) in db.session.query(Product.id).filter(Product.id.in_(counts))}
+        unknown = sorted(set(counts) - found)
+        if unknown:
+            return jsonify({'error': f'Unknown product id(s): {unknown}'}), 400
+
+    try:
+        # header + line items in one transaction: flush for the id, one commit
         new_req = Requisition(
             user_id=current['id'],
-            status=RequisitionStatus(data.get('status', 'pending')),
+            status=RequisitionStatus.PENDING,
             notes=data.get('notes', '')
         )
         db.session.add(new_req)
-        db.session.commit()  # now new_req.id is available
+        db.session.flush()  # now new_req.id is available
+        req_id = new_req.id  # read before commit expires it
 
-        # 2) Count each product_id to determine quantity
-        pid_list = data.get('product_ids', [])
-        counts   = Counter(pid_list)
-
-        # 3) Insert one RequisitionProduct per unique product, with aggregated quantity
-        for pid, qty in counts.items():
-            rp = RequisitionProduct(
-                requisition_id=new_req.id,
-                product_id=pid,
-                quantity=qty
-            )
-            db.session.add(rp)
+        if counts:
+            db.session.execute(insert(RequisitionProduct.__table__), [
+                {'requisition_id': req_id, 'product_id': pid, 'quantity': qty}
+                for pid, qty in counts.items()
+            ])
 
         db.session.commit()
 
-        return jsonify({'message': 'Requisition created', 'id': new_req.id}), 201
+        return jsonify({'message': 'Requisition created', 'id': req_id}), 201
 
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
 
-@app.route('/requisitions/<int:req_id>', methods=['PUT'])
-@jwt_required()
-def update_requisition(req_id):
-    current = get_jwt_identity()
-    if current['role'] != 'admin':
-        return jsonify({'error': 'Admins only'}), 403
+@api.route('/requisitions/<int:req_id>', methods=['GET'])
+@auth_required
+def get_requisition(req_id):
+    current = current_identity()
+    req = (Requisition.query
+           .options(*requisition_load_options())
+           .filter_by(id=req_id)
+           .first_or_404())
+    if current['role'] != 'admin' and req.user_id != current['id']:
+        return jsonify({'error': 'Not your requisition'}), 403
+    resp = jsonify(serialize_requisition(req))
+    resp.set_etag(str(req.version))  # send back as If-Match on PUT/DELETE
+    return resp
 
-    req = Requisition.query.get_or_404(req_id)
-    data = request.get_json() or {}
 
+@api.route('/requisitions/<int:req_id>', methods=['PUT'])
+@admin_required
+def update_requisition(req_id):
+    data = request.get_json() or {}
+    try:
+        expected = expected_version(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    target = None
     if 'status' in data:
         try:
-            req.status = RequisitionStatus(data['status'])
+            target = RequisitionStatus(data['status'])
         except ValueError:
             return jsonify({'error': 'Invalid status value'}), 400
 
-    db.session.commit()
+    if target is not None:
+        # transition check + compare-and-swap in one UPDATE
+        try:
+            compare_and_swap(Requisition, req_id, expected, target, REQUISITION_TRANSITIONS)
+        except WriteConflict as e:
+            db.session.rollback()
+            return jsonify(e.body()), e.status_code
+        db.session.commit()
 
     # re–serialize the single updated requisition:
+    req = (Requisition.query
+           .options(*requisition_load_options())
+           .filter_by(id=req_id)
+           .first_or_404())
+    resp = jsonify(serialize_requisition(req))
+    resp.set_etag(str(req.version))
+    return resp, 200
+
+
+
+MAX_BULK_IDS = 1000
+
+@api.route('/requisitions/status', methods=['PUT'])
+@admin_required
+def bulk_update_requisition_status():
+    data = request.get_json() or {}
+    ids = data.get('ids')
+    if (not isinstance(ids, list) or not ids
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        return jsonify({'error': 'ids must be a non-empty list of integers'}), 400
+    if len(ids) > MAX_BULK_IDS:
+        return jsonify({'error': f'At most {MAX_BULK_IDS} ids per request'}), 400
+    try:
+        target = RequisitionStatus(data.get('status'))
+    except ValueError:
+        return jsonify({'error': 'Invalid status value'}), 400
+
+    sources = [src for src, targets in REQUISITION_TRANSITIONS.items() if target in targets]
+    ids = list(dict.fromkeys(ids))
+    current_status = dict(db.session.query(Requisition.id, Requisition.status)
+                          .filter(Requisition.id.in_(ids)))
+
+    results = {}
+    eligible = []
+    for i in ids:
+        if i not in current_status:
+            results[i] = {'id': i, 'outcome': 'not_found'}
+        elif current_status[i] not in sources:
+            results[i] = {'id': i, 'outcome': 'invalid_state',
+                          'status': current_status[i].value}
+        else:
+            eligible.append(i)
+
+    if eligible:
+        # one UPDATE; the status guard skips rows another admin changed meanwhile
+        updated = (Requisition.query
+                   .filter(Requisition.id.in_(eligible), Requisition.status.in_(sources))
+                   .update({Requisition.status: target, Requisition.version: Requisition.version + 1},
+                           synchronize_session=False))
+        db.session.commit()
+        if updated != len(eligible):
+            now = dict(db.session.query(Requisition.id, Requisition.status)
+                       .filter(Requisition.id.in_(eligible)))
+            # whatever now holds the target counts as done; anything else lost a race
+            for i in eligible:
+                if now.get(i) != target:
+                    results[i] = {'id': i, 'outcome': 'conflict',
+                                  'status': now[i].value if i in now else None}
+        for i in eligible:
+            results.setdefault(i, {'id': i, 'outcome': 'updated', 'status': target.value})
+
+    out = [results[i] for i in ids]
     return jsonify({
-        'id':         req.id,
-        'user_id':    req.user_id,
-        'user_name':  req.user.name,
-        'status':     req.status.value,
-        'created_at': req.created_at.isoformat(),
-        'notes':      req.notes or '',
-        'products': [{
-            'id':       rp.product.id,
-            'name':     rp.product.name,
-            'quantity': rp.quantity,
-            'price':    rp.product.price
-        } for rp in req.products]
+        'updated': sum(r['outcome'] == 'updated' for r in out),
+        'results': out
     }), 200
 
 
-
-@app.route('/requisitions/<int:req_id>', methods=['DELETE'])
-@jwt_required()
+@api.route('/requisitions/<int:req_id>', methods=['DELETE'])
+@auth_required
 def delete_requisition(req_id):
-    current = get_jwt_identity()
+    current = current_identity()
     req = Requisition.query.get_or_404(req_id)
 
     # permission + status checks...
+    if current['role'] != 'admin' and req.user_id != current['id']:
+        return jsonify({'error': 'Not your requisition'}), 403
+    try:
+        expected = expected_version(request.get_json(silent=True))
+        # the bump holds the row until the delete commits, so an approval
+        # can't land between the status check below and the delete
+        compare_and_swap(Requisition, req_id, expected)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except WriteConflict as e:
+        db.session.rollback()
+        return jsonify(e.body()), e.status_code
+    db.session.refresh(req)
     if req.status != RequisitionStatus.PENDING:
+        db.session.rollback()
         return jsonify({'error': 'Only pending can be recalled'}), 400
 
     # manually delete the line‐items
@@ -278,90 +498,359 @@ def delete_requisition(req_id):
 
 # ------------------- LPOs -------------------
 
-@app.route('/lpos', methods=['GET'])
-@jwt_required()
+# ?sort= value -> (column, descending)
+LPO_SORT_KEYS = {
+    'date_asc':    (LPO.created_at, False),
+    'date_desc':   (LPO.created_at, True),
+    'status_asc':  (LPO.status, False),
+    'status_desc': (LPO.status, True),
+}
+
+@api.route('/lpos', methods=['GET'])
+@auth_required
 def get_lpos():
-    current = get_jwt_identity()
+    current = current_identity()
+    scope = 'admin' if current['role'] == 'admin' else f"user:{current['id']}"
+    return cached_json_response('lpos', scope, lambda: list_lpos(current))
+
+def list_lpos(current):
     query = LPO.query.join(Requisition, LPO.requisition_id==Requisition.id)
     
     if current['role'] != 'admin':
         query = query.filter(Requisition.user_id==current['id'])
     
+    status = request.args.get('status')
+    if status:
+        try:
+            query = query.filter(LPO.status == LPOStatus(status))
+        except ValueError:
+            return jsonify({"error": "Invalid status filter."}), 400
+
+    try:
+        for arg, col in (('supplier_id', LPO.supplier_id),
+                         ('requisition_id', LPO.requisition_id),
+                         ('user_id', Requisition.user_id)):
+            value = parse_int_arg(request.args, arg)
+            if value is not None:
+                query = query.filter(col == value)
+        query = query.filter(*parse_date_range(request.args, LPO.created_at))
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        expand = parse_expand(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rows = lpo_list_rows(query, expand)
+
     sort = request.args.get('sort')
-    if sort == 'date_asc':
-        query = query.order_by(LPO.created_at.asc())
-    elif sort == 'date_desc':
-        query = query.order_by(LPO.created_at.desc())
-    elif sort == 'status_asc':
-        query = query.order_by(LPO.status.asc())
-    elif sort == 'status_desc':
-        query = query.order_by(LPO.status.desc())
-    return jsonify([{
-        'id': l.id,
-        'requisition_id': l.requisition_id,
-        'supplier_id': l.supplier_id,
-        'status': l.status.value,
-        'created_at': l.created_at.isoformat(),
-        'total_value': l.total_value
-    } for l in query.all()])
-
-@app.route('/lpos/<int:id>', methods=['GET'])
+    sort_key = LPO_SORT_KEYS.get(sort)
+
+    if wants_page(request.args):
+        # the id tiebreaker follows the sort direction so the order is total
+        if sort_key:
+            col, desc = sort_key
+            keys = [(col, desc), (LPO.id, desc)]
+        else:
+            keys = [(LPO.id, False)]
+        try:
+            rows, next_cursor = keyset_page(rows, keys, request.args)
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+        return page_envelope(serialize_lpo_rows(rows, expand), next_cursor)
+
+    if sort_key:
+        col, desc = sort_key
+        rows = rows.order_by(col.desc() if desc else col.asc())
+    return json_list(rows, lambda batch: serialize_lpo_rows(batch, expand))
+
+@api.route('/lpos/<int:id>', methods=['GET'])
+@auth_required
 def get_lpo(id):
-    lpo = LPO.query.get_or_404(id)
-    return jsonify({
-        'id': lpo.id,
-        'requisition_id': lpo.requisition_id,
-        'supplier_id': lpo.supplier_id,
-        'status': lpo.status.value,
-        'created_at': lpo.created_at.isoformat(),
-        'total_value': lpo.total_value
-    })
-
-@app.route('/lpos', methods=['POST'])
+    current = current_identity()
+    try:
+        expand = parse_expand(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # the requester comes from the join, whatever ?expand= asks for
+    row = (LPO.query.join(Requisition, LPO.requisition_id == Requisition.id)
+           .options(*lpo_load_options(expand, requisition_joined=True))
+           .add_columns(Requisition.user_id)
+           .filter(LPO.id == id)
+           .first())
+    if row is None:
+        return jsonify({'error': 'LPO not found'}), 404
+    lpo, owner_id = row
+    if current['role'] != 'admin' and owner_id != current['id']:
+        return jsonify({'error': 'Not your LPO'}), 403
+    resp = jsonify(serialize_lpo(lpo, expand))
+    resp.set_etag(str(lpo.version))  # send back as If-Match on PUT
+    return resp
+
+def parse_unit_prices(raw):
+    """{product_id: unit_price} from a JSON object or a list of {product_id, price}."""
+    if raw is None:
+        return {}
+    if isinstance(raw, list):
+        raw = {item.get('product_id'): item.get('price') for item in raw if isinstance(item, dict)}
+    if not isinstance(raw, dict):
+        raise ValueError('prices must be an object or a list of {product_id, price}')
+    prices = {}
+    for pid, price in raw.items():
+        try:
+            pid = int(pid)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid product id: {pid!r}')
+        if not isinstance(price, (int, float)) or isinstance(price, bool) or price < 0:
+            raise ValueError(f'Invalid price for product {pid}')
+        prices[pid] = float(price)
+    return prices
+
+@api.route('/lpos', methods=['POST'])
+@admin_required
 def create_lpo():
     data = request.json
+    if 'status' in data:
+        return jsonify({'error': 'status cannot be set on create; LPOs start pending'}), 400
     requisition = Requisition.query.get(data['requisition_id'])
     if not requisition or requisition.status != RequisitionStatus.APPROVED:
         return jsonify({'error': 'Requisition must be approved to create LPO'}), 400
+    if db.session.query(LPO.query.filter_by(requisition_id=requisition.id).exists()).scalar():
+        return jsonify({'error': f'Requisition #{requisition.id} already has an LPO'}), 409
+    try:
+        prices = parse_unit_prices(data.get('prices'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # the LPO lines are the requisition lines; unpriced ones use the catalogue price
+    req_lines = (db.session.query(RequisitionProduct.product_id,
+                                  RequisitionProduct.quantity, Product.price)
+                 .join(Product, RequisitionProduct.product_id == Product.id)
+                 .filter(RequisitionProduct.requisition_id == requisition.id)
+                 .all())
+    extra = sorted(set(prices) - {pid for pid, _, _ in req_lines})
+    if extra:
+        return jsonify({'error': f'Product(s) {extra} are not on requisition #{requisition.id}'}), 400
+
+    lines = [{'product_id': pid, 'quantity': qty, 'price': prices.get(pid, catalogue_price)}
+             for pid, qty, catalogue_price in req_lines]
+
     try:
+        # client-sent total_value is ignored: the total is derived from the lines
         new_lpo = LPO(
-            requisition_id=data['requisition_id'],
+            requisition_id=requisition.id,
             supplier_id=data['supplier_id'],
-            status=LPOStatus(data.get('status', 'pending')),
-            total_value=data.get('total_value', 0.0)
+            status=LPOStatus.PENDING,
+            total_value=round(sum(l['quantity'] * l['price'] for l in lines), 2)
         )
         db.session.add(new_lpo)
+        db.session.flush()
+        lpo_id = new_lpo.id
+        if lines:
+            db.session.execute(insert(LPOProduct.__table__),
+                               [dict(l, lpo_id=lpo_id) for l in lines])
+        add_lpos(db.session.connection(), [lpo_id])
         db.session.commit()
-        return jsonify({'message': 'LPO created', 'id': new_lpo.id}), 201
+        return jsonify({'message': 'LPO created', 'id': lpo_id}), 201
+    except IntegrityError as e:
+        db.session.rollback()
+        # lost the race against a concurrent create for the same requisition
+        if db.session.query(LPO.query.filter_by(requisition_id=requisition.id).exists()).scalar():
+            return jsonify({'error': f'Requisition #{requisition.id} already has an LPO'}), 409
+        return jsonify({'error': str(e.orig)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
-@app.route('/lpos/<int:id>', methods=['PUT'])
+@api.route('/lpos/<int:id>', methods=['PUT'])
+@admin_required
 def update_lpo(id):
-    lpo = LPO.query.get_or_404(id)
-    data = request.json
+    data = request.get_json() or {}
+    try:
+        expected = expected_version(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    target = None
     if 'status' in data:
         try:
-            lpo.status = LPOStatus(data['status'])
+            target = LPOStatus(data['status'])
         except ValueError:
             return jsonify({'error': 'Invalid status value'}), 400
+    prices = {}
+    if 'prices' in data:
+        try:
+            prices = parse_unit_prices(data['prices'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    # lock first, so its rollup contribution and the old line prices the line
+    # hooks subtract are read after any concurrent update of this LPO commits
+    if not lock_row(LPO, id):
+        db.session.rollback()
+        return jsonify({'error': f'LPO #{id} not found'}), 404
+    lines = {l.product_id: l for l in
+             LPOProduct.query.filter(LPOProduct.lpo_id == id,
+                                     LPOProduct.product_id.in_(prices))} if prices else {}
+    missing = sorted(set(prices) - set(lines))
+    if missing:
+        db.session.rollback()
+        return jsonify({'error': f'Product(s) {missing} are not on LPO #{id}'}), 400
+
+    # its share of the spend rollups now, swapped for the final one below
+    before = contribution(db.session.connection(), [id])
+    try:
+        # version check, status transition and version bump in one UPDATE
+        version = compare_and_swap(LPO, id, expected, target, LPO_TRANSITIONS)
+    except WriteConflict as e:
+        db.session.rollback()
+        return jsonify(e.body()), e.status_code
+    # LPOProduct update hooks move total_value by each line's delta
+    for pid, price in prices.items():
+        lines[pid].price = price
+    db.session.flush()
+    replace_lpos(db.session.connection(), [id], before)
     db.session.commit()
-    return jsonify({'message': 'LPO status updated'})
+    resp = jsonify({'message': 'LPO status updated', 'version': version})
+    resp.set_etag(str(version))
+    return resp
+
+# ------------------- EXPORTS -------------------
+
+def export_response(name, fmt, body):
+    resp = Response(stream_with_context(body), mimetype=FORMATS[fmt])
+    resp.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    return resp
+
+@api.route('/export/requisitions', methods=['GET'])
+@auth_required
+def export_requisitions():
+    current = current_identity()
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+    filters = []
+    if current['role'] != 'admin':
+        filters.append(Requisition.user_id == current['id'])
+    status = request.args.get('status')
+    if status:
+        try:
+            filters.append(Requisition.status == RequisitionStatus(status))
+        except ValueError:
+            return jsonify({"error": "Invalid status filter."}), 400
+    try:
+        user_id = parse_int_arg(request.args, 'user_id')
+        if user_id is not None and current['role'] == 'admin':
+            filters.append(Requisition.user_id == user_id)
+        filters += parse_date_range(request.args, Requisition.created_at)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows = requisition_rows(filters)
+    if fmt == 'csv':
+        return export_response('requisitions', fmt, csv_lines(REQUISITION_COLUMNS, rows))
+    return export_response('requisitions', fmt, requisition_ndjson(rows))
+
+@api.route('/export/lpos', methods=['GET'])
+@auth_required
+def export_lpos():
+    current = current_identity()
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+    filters = []
+    if current['role'] != 'admin':
+        filters.append(Requisition.user_id == current['id'])
+    status = request.args.get('status')
+    if status:
+        try:
+            filters.append(LPO.status == LPOStatus(status))
+        except ValueError:
+            return jsonify({"error": "Invalid status filter."}), 400
+    try:
+        for arg, col in (('supplier_id', LPO.supplier_id), ('user_id', Requisition.user_id)):
+            value = parse_int_arg(request.args, arg)
+            if value is not None:
+                filters.append(col == value)
+        filters += parse_date_range(request.args, LPO.created_at)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows = lpo_rows(filters)
+    if fmt == 'csv':
+        return export_response('lpos', fmt, csv_lines(LPO_COLUMNS, rows))
+    return export_response('lpos', fmt, lpo_ndjson(rows))
+
+# ------------------- STATS -------------------
+
+@api.route('/stats', methods=['GET'])
+@auth_required
+def get_dashboard_stats():
+    current = current_identity()
+    # admins see everything; users only their own requisitions and LPOs
+    user_id = None if current['role'] == 'admin' else current['id']
+    return jsonify(get_stats(user_id)), 200
+
+# ------------------- REPORTS -------------------
+
+MONTH_RE = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+SPEND_REPORTS = {
+    'suppliers': spend_by_supplier,
+    'products': spend_by_product,
+    'months': spend_by_month,
+    'statuses': spend_by_status,
+}
+
+@api.route('/reports/spend/<by>', methods=['GET'])
+@admin_required
+def spend_report(by):
+    report = SPEND_REPORTS.get(by)
+    if report is None:
+        return jsonify({'error': f"Unknown report; one of {', '.join(SPEND_REPORTS)}"}), 404
+    months = (request.args.get('from'), request.args.get('to'))
+    if any(m and not MONTH_RE.match(m) for m in months):
+        return jsonify({'error': 'from/to must be months as YYYY-MM'}), 400
+    status = request.args.get('status')
+    try:
+        status = LPOStatus(status) if status else None
+    except ValueError:
+        return jsonify({'error': 'Invalid status filter.'}), 400
+    # reads only the supplier_spend/product_spend rollups
+    return jsonify(report(db.session.connection(), months=months, status=status)), 200
+
+@api.route('/cache/stats', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    cache = get_cache()
+    return jsonify({
+        'backend': type(cache.backend).__name__,
+        'namespaces': cache.metrics()
+    }), 200
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Prometheus scrape target; restrict it to the monitoring network at the proxy
+    return metrics_response()
 
 # ------------------- PRODUCTS -------------------
 
-@app.route('/products', methods=['GET'])
+@api.route('/products', methods=['GET'])
 def get_products():
-    products = Product.query.all()
-    return jsonify([{
-        'id': p.id,
-        'name': p.name,
-        'price': p.price,
-        'description': p.description
-    } for p in products])
-
-@app.route('/products', methods=['POST'])
+    def build():
+        if wants_page(request.args):
+            try:
+                rows, next_cursor = keyset_page(Product.query, [(Product.id, False)], request.args)
+            except PaginationError as e:
+                return jsonify({'error': str(e)}), 400
+            return page_envelope([serialize_product(p) for p in rows], next_cursor)
+        return [serialize_product(p) for p in Product.query.all()]
+
+    # ETag/304 from a digest of the cached body; no query when unchanged
+    return cached_collection_response('products', build)
+
+@api.route('/products', methods=['POST'])
 def create_product():
     data = request.json
     try:
@@ -377,7 +866,7 @@ def create_product():
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
-@app.route('/products/<int:id>', methods=['PUT'])
+@api.route('/products/<int:id>', methods=['PUT'])
 def update_product(id):
     product = Product.query.get_or_404(id)
     data = request.json
@@ -387,10 +876,11 @@ def update_product(id):
     db.session.commit()
     return jsonify({'message': 'Product updated'})
 
-@app.route('/products/<int:id>', methods=['DELETE'])
+@api.route('/products/<int:id>', methods=['DELETE'])
 def delete_product(id):
     product = Product.query.get_or_404(id)
-    if product.requisitions or product.lpos:
+    on_lpo = db.session.query(LPOProduct.query.filter_by(product_id=id).exists()).scalar()
+    if product.requisition_products or on_lpo:
         return jsonify({'error': 'Cannot delete product linked to requisitions or LPOs'}), 400
     db.session.delete(product)
     db.session.commit()
@@ -398,17 +888,21 @@ def delete_product(id):
 
 # ------------------- SUPPLIERS -------------------
 
-@app.route('/suppliers', methods=['GET'])
+@api.route('/suppliers', methods=['GET'])
 def get_suppliers():
-    suppliers = Supplier.query.all()
-    return jsonify([{
-        'id': s.id,
-        'name': s.name,
-        'contact_name': s.contact_name,
-        'contact_email': s.contact_email
-    } for s in suppliers])
-
-@app.route('/suppliers', methods=['POST'])
+    def build():
+        if wants_page(request.args):
+            try:
+                rows, next_cursor = keyset_page(Supplier.query, [(Supplier.id, False)], request.args)
+            except PaginationError as e:
+                return jsonify({'error': str(e)}), 400
+            return page_envelope([serialize_supplier(s) for s in rows], next_cursor)
+        return [serialize_supplier(s) for s in Supplier.query.all()]
+
+    # ETag/304 from a digest of the cached body; no query when unchanged
+    return cached_collection_response('suppliers', build)
+
+@api.route('/suppliers', methods=['POST'])
 def create_supplier():
     data = request.json
     try:
@@ -424,7 +918,7 @@ def create_supplier():
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
-@app.route('/suppliers/<int:id>', methods=['PUT'])
+@api.route('/suppliers/<int:id>', methods=['PUT'])
 def update_supplier(id):
     supplier = Supplier.query.get_or_404(id)
     data = request.json
@@ -434,23 +928,164 @@ def update_supplier(id):
     db.session.commit()
     return jsonify({'message': 'Supplier updated'})
 
-@app.route('/suppliers/<int:id>', methods=['DELETE'])
+@api.route('/suppliers/<int:id>', methods=['DELETE'])
 def delete_supplier(id):
     supplier = Supplier.query.get_or_404(id)
     db.session.delete(supplier)
     db.session.commit()
     return jsonify({'message': 'Supplier deleted'})
 
-@app.route('/seed', methods=['POST'])
+# ------------------- SEARCH -------------------
+
+SEARCH_RESULTS = {
+    'products': (Product, serialize_product, None),
+    'suppliers': (Supplier, serialize_supplier, None),
+    'requisitions': (Requisition, serialize_requisition, requisition_load_options),
+}
+
+@api.route('/search', methods=['GET'])
+@auth_required
+def search():
+    current = current_identity()
+    words = terms(request.args.get('q'))
+    if not words:
+        return jsonify({'error': 'q must contain at least one letter or digit'}), 400
+    kinds = request.args.get('type', ','.join(INDEXES)).split(',')
+    unknown = [k for k in kinds if k not in INDEXES]
+    if unknown:
+        return jsonify({'error': f"Unknown type(s): {', '.join(unknown)}"}), 400
+    try:
+        limit = parse_limit(request.args)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    results = {}
+    try:
+        for kind in kinds:
+            model, serialize, load_options = SEARCH_RESULTS[kind]
+            # users only find their own requisitions
+            owner_id = current['id'] if kind == 'requisitions' and current['role'] != 'admin' else None
+            ids = search_ids(kind, words, limit, owner_id)
+            query = model.query.options(*load_options()) if load_options else model.query
+            rows = query.filter(model.id.in_(ids)).all() if ids else []
+            by_id = {row.id: row for row in rows}
+            results[kind] = [serialize(by_id[i]) for i in ids if i in by_id]
+    except SearchUnavailable as e:
+        return jsonify({'error': str(e)}), 501
+    return jsonify(results), 200
+
+# ------------------- JOBS -------------------
+
+def accepted(job):
+    resp = jsonify({'job_id': job.id, 'status': job.status.value})
+    resp.headers['Location'] = f'/jobs/{job.id}'
+    return resp, 202
+
+@api.route('/seed', methods=['POST'])
+@admin_required
 def seed_data():
-    from seed import seed_database
+    current = current_identity()
+    # an empty body seeds the small demo set; any option runs the bulk generator
+    data = request.get_json(silent=True) or {}
     try:
-        seed_database(db)
-        return jsonify({'message': 'Seeded successfully'})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        if data:
+            job = enqueue('bulk_seed', parse_bulk_seed_options(data), current['id'])
+        else:
+            job = enqueue('seed', user_id=current['id'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return accepted(job)
 
+@api.route('/jobs', methods=['GET'])
+@admin_required
+def list_jobs():
+    query = Job.query
+    status = request.args.get('status')
+    if status:
+        try:
+            query = query.filter(Job.status == JobStatus(status))
+        except ValueError:
+            return jsonify({"error": "Invalid status filter."}), 400
+    kind = request.args.get('kind')
+    if kind:
+        query = query.filter(Job.kind == kind)
 
+    if wants_page(request.args):
+        try:
+            rows, next_cursor = keyset_page(query, [(Job.id, True)], request.args)
+        except PaginationError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(page_envelope([serialize_job(j) for j in rows], next_cursor)), 200
+
+    return jsonify([serialize_job(j) for j in query.order_by(Job.id.desc()).all()]), 200
+
+@api.route('/jobs/<int:job_id>', methods=['GET'])
+@auth_required
+def get_job(job_id):
+    current = current_identity()
+    job = db.session.get(Job, job_id)
+    if job is None or (current['role'] != 'admin' and job.created_by != current['id']):
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(serialize_job(job)), 200
+
+
+@api.cli.command('seed')
+@click.option('--users', default=SEED_DEFAULTS['users'], show_default=True, help='Users to create.')
+@click.option('--products', default=SEED_DEFAULTS['products'], show_default=True, help='Products to create.')
+@click.option('--suppliers', default=SEED_DEFAULTS['suppliers'], show_default=True, help='Suppliers to create.')
+@click.option('--requisitions', default=SEED_DEFAULTS['requisitions'], show_default=True, help='Requisitions to create.')
+@click.option('--max-lines', default=SEED_DEFAULTS['max_lines'], show_default=True, help='Max line items per requisition.')
+@click.option('--approved-ratio', default=SEED_DEFAULTS['approved_ratio'], show_default=True, help='Share of requisitions approved.')
+@click.option('--lpo-ratio', default=SEED_DEFAULTS['lpo_ratio'], show_default=True, help='Share of approved requisitions with an LPO.')
+@click.option('--admins', default=SEED_DEFAULTS['admins'], show_default=True, help='How many of the new users are admins.')
+@click.option('--batch-size', default=SEED_DEFAULTS['batch_size'], show_default=True, help='Requisitions per insert transaction.')
+@click.option('--workers', default=None, type=int, help='Generator processes [default: CPU count].')
+@click.option('--seed', default=SEED_DEFAULTS['seed'], show_default=True, help='Random seed; same options give the same data.')
+def seed_command(**options):
+    """Bulk-generate a large synthetic dataset for load testing."""
+    bulk_seed(db, **options, log=click.echo)
+
+
+@api.cli.command('worker')
+@click.option('--poll-interval', type=float, default=None,
+              help='Seconds between queue polls [default: JOB_POLL_INTERVAL].')
+@click.option('--once', is_flag=True, help='Exit when the queue is empty.')
+def worker_command(poll_interval, once):
+    """Run queued background jobs (POST /seed, ...)."""
+    Worker(current_app._get_current_object(), poll_interval, log=click.echo).run(once=once)
+
+
+@api.cli.command('reindex')
+def reindex_command():
+    """Rebuild the full-text search tables from scratch."""
+    with db.engine.begin() as connection:
+        counts = rebuild(connection)
+    for kind, count in counts.items():
+        click.echo(f'{kind}: {count} indexed')
+
+
+
+@api.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the spend rollups from every LPO (backfill/repair)."""
+    with db.engine.begin() as connection:
+        counts = rebuild_rollups(connection)
+    for table, count in counts.items():
+        click.echo(f'{table}: {count} rows')
+
+
+@api.cli.command('check-rollups')
+def check_rollups_command():
+    """Compare the spend rollups with a full recomputation; exit 1 if they differ."""
+    with db.engine.connect() as connection:
+        differences = check_rollups(connection)
+    for d in differences[:50]:
+        click.echo(json.dumps(d))
+    if differences:
+        click.echo(f'{len(differences)} bucket(s) differ; run `flask rebuild-rollups`', err=True)
+        raise SystemExit(1)
+    click.echo('spend rollups are consistent')
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # local development only; production runs under gunicorn (see wsgi.py)
+    create_app().run()
@@ -0,0 +1,146 @@
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, jsonify
+from flask_jwt_extended import (JWTManager, create_access_token, create_refresh_token, current_user,
+                                decode_token, get_jwt, jwt_required)
+
+from cache import get_cache
+from models import db, User, RevokedToken
+
+jwt = JWTManager()
+
+# Tokens carry the user id as their subject (a string, as PyJWT requires)
+# and the role at login as a 'role' claim for the client's own routing, but
+# authorization uses the user's *current* role and active flag. Those are read through the cache
+# ('principals' namespace, AUTH_CACHE_TTL seconds), so a role change or
+# deactivation is honoured within that TTL in every process and at once in
+# the process that made it (with CACHE_BACKEND=redis, everywhere at once).
+#
+# Revocation, checked on every request in O(1):
+#   * one token (logout): its jti goes into revoked_tokens, looked up by
+#     primary key, so it stays revoked across cache evictions, restarts and
+#     worker processes; the cache backend remembers it too, which answers
+#     repeat uses of a revoked token without the lookup;
+#   * all of a user's tokens (password reset, deactivation): any token issued
+#     at or before users.tokens_valid_after is rejected, via the principal.
+
+
+def init_auth(app):
+    jwt.init_app(app)
+
+
+def _user_id(payload):
+    return int(payload['sub'])
+
+
+def load_principal(user_id):
+    """{'id', 'role', 'active', 'valid_after'} for a user, None if they don't exist."""
+    def fetch():
+        row = (db.session.query(User.role, User.is_active, User.tokens_valid_after)
+               .filter(User.id == user_id).first())
+        if row is None:
+            return None
+        role, active, valid_after = row
+        return {'id': user_id, 'role': role, 'active': bool(active),
+                'valid_after': int(valid_after.replace(tzinfo=timezone.utc).timestamp())
+                               if valid_after else None}
+    ttl = current_app.config.get('AUTH_CACHE_TTL', 30)
+    return get_cache().remember_json('principals', str(user_id), fetch, ttl)
+
+
+# ------------------- JWT CALLBACKS -------------------
+
+@jwt.token_in_blocklist_loader
+def _token_revoked(jwt_header, payload):
+    if get_cache().backend.get(f"revoked:{payload['jti']}") is not None:
+        return True
+    # the cache is only a fast path: its entries can be evicted or belong to another worker
+    if db.session.get(RevokedToken, payload['jti']) is not None:
+        return True
+    principal = load_principal(_user_id(payload))
+    if principal is None or not principal['active']:
+        return True
+    return principal['valid_after'] is not None and payload['iat'] <= principal['valid_after']
+
+
+@jwt.user_lookup_loader
+def _lookup_user(jwt_header, payload):
+    return load_principal(_user_id(payload))
+
+
+@jwt.revoked_token_loader
+def _revoked_response(jwt_header, payload):
+    return jsonify({'error': 'Token has been revoked'}), 401
+
+
+# ------------------- ISSUING -------------------
+
+def issue_access_token(principal):
+    return create_access_token(identity=str(principal['id']),
+                               additional_claims={'role': principal['role']})
+
+
+def issue_refresh_token(principal):
+    return create_refresh_token(identity=str(principal['id']))
+
+
+# ------------------- DECORATORS -------------------
+
+def current_identity():
+    """{'id', 'role'} of the caller, with the role as of now rather than as of login."""
+    return {'id': current_user['id'], 'role': current_user['role']}
+
+
+def auth_required(fn):
+    return jwt_required()(fn)
+
+
+def admin_required(fn):
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if current_user['role'] != 'admin':
+            return jsonify({'error': 'Admins only'}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+# ------------------- REVOCATION -------------------
+
+def revoke_token(payload):
+    """Revoke the single token described by `payload` (logout)."""
+    ttl = max(1, int(payload['exp'] - time.time()))
+    get_cache().backend.set(f"revoked:{payload['jti']}", 1, ttl)
+    now = datetime.utcnow()
+    db.session.query(RevokedToken).filter(RevokedToken.expires_at < now).delete()
+    db.session.merge(RevokedToken(
+        jti=payload['jti'], user_id=_user_id(payload),
+        expires_at=datetime.fromtimestamp(payload['exp'], timezone.utc).replace(tzinfo=None)))
+
+
+def revoke_current_token():
+    revoke_token(get_jwt())
+
+
+def revoke_encoded_token(encoded, user_id):
+    """Revoke a token passed in a request body (the refresh token on logout).
+
+    Raises ValueError unless it is a valid token of `user_id`; expired or
+    already revoked tokens are accepted and left alone.
+    """
+    try:
+        payload = decode_token(encoded, allow_expired=True)
+    except Exception:
+        raise ValueError('Invalid token') from None
+    if _user_id(payload) != user_id:
+        raise ValueError('Token belongs to another user')
+    if payload['exp'] > time.time():
+        revoke_token(payload)
+
+
+def revoke_all_tokens(user):
+    """Invalidate every token issued to `user` so far (caller commits)."""
+    # token iat has whole-second resolution; see the <= in _token_revoked
+    user.tokens_valid_after = datetime.utcnow().replace(microsecond=0)
@@ -0,0 +1,290 @@
+"""Benchmark the API hot paths against seeded SQLite databases.
+
+    python benchmarks/api_bench.py --sizes 1000,100000,1000000 --out bench.json
+    python benchmarks/api_bench.py --sizes 1000 --compare bench.json
+
+For every size a database is generated once with `flask seed`'s bulk_seed
+(fixed seed, so every run sees the same rows) and kept as
+lpo_bench_api_<size>.db; each run works on a fresh copy of it. The app is
+booted in-process with create_app() and driven through Flask's test client,
+so the numbers cover routing, auth, queries and serialization but not the
+network or the WSGI server.
+
+GET cases run with the response cache emptied before every call: they
+measure the query and serialization path that the cache would otherwise
+hide. Each case records wall time percentiles and the number of SQL
+statements per call; the latter is machine-independent and catches N+1
+regressions on any hardware.
+
+--compare prints the change in median against an earlier result file and
+exits with status 1 when a case slowed down by more than --threshold (and
+--min-delta-ms), or issues more statements than before.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import event, func, text  # noqa: E402
+
+from app import create_app, LPO_SORT_KEYS  # noqa: E402
+from config import Config  # noqa: E402
+from models import db, User, Product, Supplier, Requisition, LPO, RequisitionStatus  # noqa: E402
+from seed import bulk_seed, DEFAULT_PASSWORD  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def bench_config(path):
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_ENGINE_OPTIONS': {},
+        'CACHE_BACKEND': 'memory',
+        'SLOW_QUERY_MS': 0,
+        # /login is measured back to back from one address
+        'LOGIN_RATE_PER_MINUTE': 10 ** 9,
+        'LOGIN_BURST': 10 ** 9,
+    })
+
+
+# ------------------- DATASETS -------------------
+
+def seeded_db(size, db_dir, workers):
+    """Path of the seed database for `size` requisitions, built if needed."""
+    path = os.path.join(db_dir, f'lpo_bench_api_{size}.db')
+    if os.path.exists(path):
+        conn = sqlite3.connect(path)
+        try:
+            have = conn.execute('SELECT COUNT(*) FROM requisitions').fetchone()[0]
+        except sqlite3.Error:
+            have = None
+        conn.close()
+        if have == size:
+            return path
+        os.remove(path)
+
+    app = create_app(bench_config(path))
+    with app.app_context():
+        db.create_all()
+        bulk_seed(db, users=max(50, size // 100), products=500, suppliers=50,
+                  requisitions=size, batch_size=min(size, 20_000), workers=workers,
+                  seed=42, log=lambda msg: print('   ', msg, file=sys.stderr))
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    return path
+
+
+# ------------------- MEASURING -------------------
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._hit)
+
+    def _hit(self, *args):
+        self.count += 1
+
+
+def summarize(samples, statements):
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, round(0.95 * (len(ms) - 1)))]
+    return {
+        'n': len(ms),
+        'median_ms': round(statistics.median(ms), 3),
+        'mean_ms': round(statistics.fmean(ms), 3),
+        'p95_ms': round(p95, 3),
+        'min_ms': round(ms[0], 3),
+        'stdev_ms': round(statistics.stdev(ms), 3) if len(ms) > 1 else 0.0,
+        'statements': max(statements),
+    }
+
+
+def measure(client, counter, call, repeat, warmup, cache=None):
+    samples, statements = [], []
+    for i in range(warmup + repeat):
+        if cache is not None:
+            cache.backend.clear()
+        before = counter.count
+        t0 = time.perf_counter()
+        resp = call(i)
+        elapsed = time.perf_counter() - t0
+        if resp.status_code >= 400:
+            raise RuntimeError(f'{resp.status_code}: {resp.get_data(as_text=True)[:200]}')
+        if i >= warmup:
+            samples.append(elapsed)
+            statements.append(counter.count - before)
+    return summarize(samples, statements)
+
+
+def run_size(size, args):
+    seed_path = seeded_db(size, args.db_dir, args.workers)
+    work_path = os.path.join(args.db_dir, f'lpo_bench_api_{size}.work.db')
+    shutil.copyfile(seed_path, work_path)
+
+    app = create_app(bench_config(work_path))
+    results = {}
+    try:
+        with app.app_context():
+            counter = StatementCounter(db.engine)
+            admin = db.session.query(User).filter_by(role='admin').order_by(User.id).first()
+            # the user with the most requisitions: the worst case for a user's own list
+            user_id = (db.session.query(Requisition.user_id)
+                       .join(User, User.id == Requisition.user_id).filter(User.role == 'user')
+                       .group_by(Requisition.user_id)
+                       .order_by(func.count(Requisition.id).desc()).limit(1).scalar())
+            user = db.session.get(User, user_id)
+            admin_auth = {'Authorization': 'Bearer ' + create_access_token(
+                identity=str(admin.id))}
+            user_auth = {'Authorization': 'Bearer ' + create_access_token(
+                identity=str(user.id))}
+            product_ids = [pid for (pid,) in db.session.query(Product.id).order_by(Product.id).limit(3)]
+            supplier_id = db.session.query(Supplier.id).order_by(Supplier.id).limit(1).scalar()
+            # approved requisitions without an LPO, one per POST /lpos call
+            free = [rid for (rid,) in db.session.query(Requisition.id)
+                    .outerjoin(LPO, LPO.requisition_id == Requisition.id)
+                    .filter(Requisition.status == RequisitionStatus.APPROVED, LPO.id.is_(None))
+                    .order_by(Requisition.id).limit(args.warmup + args.repeat)]
+            login_body = {'email': user.email, 'password': DEFAULT_PASSWORD}
+            db.session.remove()
+
+        client = app.test_client()
+        cache = app.extensions['cache']
+        get = lambda url, headers, cold=True: measure(  # noqa: E731
+            client, counter, lambda i: client.get(url, headers=headers),
+            args.repeat, args.warmup, cache if cold else None)
+
+        results['login'] = measure(client, counter, lambda i: client.post('/login', json=login_body),
+                                   args.login_repeat, 1)
+        results['requisitions_admin_page'] = get('/requisitions?limit=50', admin_auth)
+        results['requisitions_admin_pending_page'] = get('/requisitions?status=pending&limit=50', admin_auth)
+        results['requisitions_user'] = get('/requisitions', user_auth)
+        results['requisitions_admin_cached'] = get('/requisitions?limit=50', admin_auth, cold=False)
+        for sort in LPO_SORT_KEYS:
+            results[f'lpos_{sort}_page'] = get(f'/lpos?sort={sort}&limit=50', admin_auth)
+        if size <= args.full_list_max:
+            # unpaginated lists, what the current client requests
+            results['requisitions_admin_all'] = get('/requisitions', admin_auth)
+            for sort in LPO_SORT_KEYS:
+                results[f'lpos_{sort}_all'] = get(f'/lpos?sort={sort}', admin_auth)
+
+        results['create_requisition'] = measure(
+            client, counter,
+            lambda i: client.post('/requisitions', headers=user_auth, json={
+                'notes': 'bench', 'items': [{'product_id': pid, 'quantity': 2} for pid in product_ids]}),
+            args.repeat, args.warmup)
+        if len(free) < args.warmup + args.repeat:
+            print(f'    only {len(free)} approved requisitions without an LPO; '
+                  'skipping create_lpo', file=sys.stderr)
+        else:
+            results['create_lpo'] = measure(
+                client, counter,
+                lambda i: client.post('/lpos', headers=admin_auth, json={
+                    'requisition_id': free[i], 'supplier_id': supplier_id}),
+                args.repeat, args.warmup)
+    finally:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(work_path + suffix):
+                os.remove(work_path + suffix)
+    return results
+
+
+# ------------------- REPORTING -------------------
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(old, new, threshold, min_delta_ms):
+    """Print median deltas; returns the list of regressed cases."""
+    regressions = []
+    for size, cases in new['results'].items():
+        for name, cur in cases.items():
+            prev = old.get('results', {}).get(size, {}).get(name)
+            if prev is None:
+                continue
+            ratio = cur['median_ms'] / prev['median_ms'] if prev['median_ms'] else 1.0
+            flag = ''
+            if ratio > 1 + threshold and cur['median_ms'] - prev['median_ms'] >= min_delta_ms:
+                flag = '  SLOWER'
+            if cur['statements'] > prev['statements']:
+                flag += f"  +{cur['statements'] - prev['statements']} statements"
+            if flag:
+                regressions.append(f'{size}/{name}')
+            print(f'{size:>9} {name:36} {prev["median_ms"]:10.2f} -> {cur["median_ms"]:10.2f} ms'
+                  f'  ({(ratio - 1) * 100:+6.1f}%){flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000',
+                        help='comma-separated requisition counts')
+    parser.add_argument('--repeat', type=int, default=20, help='measured calls per case')
+    parser.add_argument('--warmup', type=int, default=3, help='unmeasured calls per case')
+    parser.add_argument('--login-repeat', type=int, default=10,
+                        help='measured /login calls (each one is a full password hash)')
+    parser.add_argument('--full-list-max', type=int, default=10_000,
+                        help='largest size for which unpaginated lists are measured')
+    parser.add_argument('--db-dir', default=HERE, help='where seed databases are kept')
+    parser.add_argument('--workers', type=int, default=None, help='bulk_seed processes')
+    parser.add_argument('--out', help='write results as JSON here (default: stdout)')
+    parser.add_argument('--compare', help='earlier JSON result to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed median slowdown before --compare fails (0.25 = 25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignore slowdowns smaller than this, timer noise on fast cases')
+    args = parser.parse_args()
+
+    report = {'meta': metadata(), 'results': {}}
+    for size in (int(s) for s in args.sizes.split(',')):
+        print(f'== {size} requisitions', file=sys.stderr)
+        t0 = time.perf_counter()
+        report['results'][str(size)] = run_size(size, args)
+        print(f'   done in {time.perf_counter() - t0:.1f}s', file=sys.stderr)
+
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(payload + '\n')
+    elif not args.compare:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s): ' + ', '.join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Race concurrent status changes and LPO creation against a running server.
+
+    python benchmarks/concurrency_stress.py http://127.0.0.1:5000 \
+        --token $ADMIN_TOKEN --rounds 20 --threads 8
+
+Every round creates a pending requisition, then --threads threads released
+by one barrier each try to approve or reject it (half with If-Match, half
+without). Exactly one must get 200; the rest must get 409 (wrong state) or
+412 (stale version). If the winner approved it, the threads then race to
+create its LPO: exactly one 201, the rest 409. Finally the requisition must
+be at version 2 with the winning status, and have exactly one LPO.
+
+Prints the status mix and exits with status 1 on the first broken
+invariant. Run it against a throwaway database: it leaves its requisitions
+and LPOs behind. Standard library only, like http_load.py.
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+class Client:
+    def __init__(self, base_url, token):
+        parts = urlsplit(base_url)
+        cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.conn = cls(parts.netloc, timeout=30)
+        self.prefix = parts.path.rstrip('/')
+        self.token = token
+
+    def call(self, method, path, body=None, headers=None):
+        headers = dict(headers or {}, Authorization=f'Bearer {self.token}')
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps(body)
+        self.conn.request(method, self.prefix + path, body=body, headers=headers)
+        resp = self.conn.getresponse()
+        raw = resp.read()
+        return resp.status, resp.getheader('ETag'), json.loads(raw) if raw else None
+
+    def close(self):
+        self.conn.close()
+
+
+def race(base_url, token, threads, attempt):
+    """Run attempt(client, i) on `threads` threads at once; list of results by i."""
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+
+    def worker(i):
+        client = Client(base_url, token)
+        try:
+            barrier.wait()
+            results[i] = attempt(client, i)
+        finally:
+            client.close()
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return results
+
+
+def check(condition, message):
+    if not condition:
+        print('FAILED:', message)
+        sys.exit(1)
+
+
+def run_round(base_url, token, threads, admin, product_id, supplier_id, statuses):
+    status, _, body = admin.call('POST', '/requisitions',
+                                 {'product_ids': [product_id], 'notes': 'concurrency stress'})
+    check(status == 201, f'creating a requisition answered {status}: {body}')
+    req_id = body['id']
+    status, etag, _ = admin.call('GET', f'/requisitions/{req_id}')
+    check(status == 200 and etag, f'GET /requisitions/{req_id} answered {status} without an ETag')
+
+    def decide(client, i):
+        # alternate approve/reject, and If-Match/no precondition
+        headers = {'If-Match': etag} if i % 4 < 2 else {}
+        return client.call('PUT', f'/requisitions/{req_id}',
+                           {'status': 'approved' if i % 2 == 0 else 'rejected'}, headers)
+
+    results = race(base_url, token, threads, decide)
+    codes = [code for code, _, _ in results]
+    statuses.update(f'PUT requisition {code}' for code in codes)
+    winners = [body for code, _, body in results if code == 200]
+    check(len(winners) == 1, f'requisition #{req_id}: {len(winners)} winners, statuses {codes}')
+    check(all(code in (200, 409, 412) for code in codes),
+          f'requisition #{req_id}: unexpected statuses {codes}')
+    winner = winners[0]
+
+    status, etag, body = admin.call('GET', f'/requisitions/{req_id}')
+    check(body['status'] == winner['status'] and body['version'] == 2 and etag == '"2"',
+          f'requisition #{req_id} ended as {body["status"]} v{body["version"]}, '
+          f'winner set {winner["status"]}')
+    if winner['status'] != 'approved':
+        return
+
+    def create(client, i):
+        return client.call('POST', '/lpos', {'requisition_id': req_id, 'supplier_id': supplier_id})
+
+    results = race(base_url, token, threads, create)
+    codes = [code for code, _, _ in results]
+    statuses.update(f'POST lpo {code}' for code in codes)
+    check(codes.count(201) == 1 and codes.count(409) == threads - 1,
+          f'requisition #{req_id}: LPO creation statuses {codes}')
+    lpo_id = next(body['id'] for code, _, body in results if code == 201)
+    status, etag, body = admin.call('GET', f'/lpos/{lpo_id}')
+    check(status == 200 and body['version'] == 1 and etag == '"1"',
+          f'LPO #{lpo_id} answered {status}: {body}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('url', help='API root, e.g. http://127.0.0.1:5000')
+    parser.add_argument('--token', required=True, help="an admin's JWT")
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+    check(args.threads >= 2, '--threads must be at least 2')
+
+    admin = Client(args.url, args.token)
+    status, _, products = admin.call('GET', '/products?limit=1')
+    check(status == 200 and products['items'], 'needs at least one product')
+    status, _, suppliers = admin.call('GET', '/suppliers?limit=1')
+    check(status == 200 and suppliers['items'], 'needs at least one supplier')
+
+    statuses = Counter()
+    for _ in range(args.rounds):
+        run_round(args.url, args.token, args.threads, admin,
+                  products['items'][0]['id'], suppliers['items'][0]['id'], statuses)
+    admin.close()
+
+    print(f'{args.rounds} rounds x {args.threads} threads: every race had exactly one winner')
+    for key, count in sorted(statuses.items()):
+        print(f'  {key}: {count}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Closed-loop HTTP load generator for a running server.
+
+    python benchmarks/http_load.py http://127.0.0.1:8000/requisitions \
+        --token $TOKEN --concurrency 32 --duration 20
+
+Each of --concurrency threads sends a request, waits for the answer and
+sends the next one, for --duration seconds. Prints throughput, latency
+percentiles and the status code mix. Standard library only, so it runs
+anywhere the server does.
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run(url, concurrency=16, duration=10.0, method='GET', body=None, headers=None):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    conn_cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    headers = dict(headers or {})
+    if body is not None:
+        headers.setdefault('Content-Type', 'application/json')
+
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        conn = conn_cls(parts.netloc, timeout=30)  # keep-alive, one per thread
+        mine, codes = [], Counter()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                codes[resp.status] += 1
+            except (OSError, http.client.HTTPException):
+                codes['error'] += 1
+                conn.close()
+                conn = conn_cls(parts.netloc, timeout=30)
+                continue
+            mine.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            statuses.update(codes)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda v: None if v is None else round(v * 1000, 2)  # noqa: E731
+    return {
+        'url': url,
+        'method': method,
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': ms(statistics.fmean(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1] if latencies else None),
+        },
+        'statuses': {str(k): v for k, v in sorted(statuses.items(), key=str)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('url')
+    parser.add_argument('--concurrency', '-c', type=int, default=16)
+    parser.add_argument('--duration', '-d', type=float, default=10.0)
+    parser.add_argument('--method', '-X', default='GET')
+    parser.add_argument('--data', help='request body (JSON)')
+    parser.add_argument('--token', help='JWT sent as a Bearer token')
+    args = parser.parse_args()
+
+    headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+    result = run(args.url, args.concurrency, args.duration, args.method.upper(),
+                 args.data.encode() if args.data else None, headers)
+
+    lat = result['latency_ms']
+    print(f"{result['requests']} requests in {result['duration_s']}s "
+          f"({result['rps']} req/s) at concurrency {result['concurrency']}")
+    print(f"latency ms: mean {lat['mean']}  p50 {lat['p50']}  p95 {lat['p95']}  "
+          f"p99 {lat['p99']}  max {lat['max']}")
+    print('statuses:', result['statuses'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Show EXPLAIN QUERY PLAN and timings for the hot queries, before and after
+the indexes declared in models.py.
+
+    python benchmarks/query_plans.py --requisitions 1000000 --db /tmp/lpo_bench.db
+
+The database is built once (and reused on later runs if it already has the
+requested number of rows); the script then drops every secondary index,
+measures, recreates them and measures again.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, text  # noqa: E402
+from models import db, Requisition, LPO, RequisitionProduct  # noqa: E402
+
+STATUSES = ['PENDING', 'APPROVED', 'REJECTED']
+LPO_STATUSES = ['PENDING', 'DELIVERED', 'NOT_DELIVERED']
+
+
+def build(path, n_reqs, n_users=1000, n_products=500, n_suppliers=50, batch=50000):
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    have = conn.execute('SELECT COUNT(*) FROM requisitions').fetchone()[0]
+    if have == n_reqs:
+        conn.close()
+        return
+    if have:
+        sys.exit(f'{path} already has {have} requisitions; pick another --db')
+
+    rnd = random.Random(42)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany(
+        'INSERT INTO users (id, name, email, password_hash, role) VALUES (?, ?, ?, ?, ?)',
+        [(i, f'User {i}', f'user{i}@example.com', 'x' * 100, 'user')
+         for i in range(1, n_users + 1)])
+    conn.executemany(
+        'INSERT INTO products (id, name, price) VALUES (?, ?, ?)',
+        [(i, f'Product {i}', round(rnd.uniform(1, 999), 2)) for i in range(1, n_products + 1)])
+    conn.executemany(
+        'INSERT INTO suppliers (id, name) VALUES (?, ?)',
+        [(i, f'Supplier {i}') for i in range(1, n_suppliers + 1)])
+
+    start = datetime(2023, 1, 1)
+    span = 3 * 365 * 24 * 3600
+    lpo_id = 0
+    for lo in range(1, n_reqs + 1, batch):
+        reqs, lines, lpos = [], [], []
+        for rid in range(lo, min(lo + batch, n_reqs + 1)):
+            status = rnd.choice(STATUSES)
+            created = start + timedelta(seconds=rnd.randrange(span))
+            reqs.append((rid, rnd.randint(1, n_users), status, created.isoformat(' '), 'bench'))
+            for pid in rnd.sample(range(1, n_products + 1), 2):
+                lines.append((rid, pid, rnd.randint(1, 5)))
+            if status == 'APPROVED':
+                lpo_id += 1
+                lpos.append((lpo_id, rid, rnd.randint(1, n_suppliers), rnd.choice(LPO_STATUSES),
+                             (created + timedelta(days=1)).isoformat(' '), 0.0))
+        conn.executemany(
+            'INSERT INTO requisitions (id, user_id, status, created_at, notes) VALUES (?, ?, ?, ?, ?)', reqs)
+        conn.executemany(
+            'INSERT INTO requisition_product (requisition_id, product_id, quantity) VALUES (?, ?, ?)', lines)
+        conn.executemany(
+            'INSERT INTO lpos (id, requisition_id, supplier_id, status, created_at, total_value) '
+            'VALUES (?, ?, ?, ?, ?, ?)', lpos)
+        conn.commit()
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.close()
+
+
+def hot_queries():
+    """The statements behind the list endpoints, compiled for SQLite."""
+    stmts = {
+        'user requisitions by status': select(Requisition)
+            .where(Requisition.user_id == 7, Requisition.status == 'PENDING')
+            .order_by(Requisition.created_at.desc()).limit(50),
+        'admin requisitions page': select(Requisition)
+            .order_by(Requisition.created_at.desc(), Requisition.id.desc()).limit(50),
+        'admin requisitions by status': select(Requisition)
+            .where(Requisition.status == 'APPROVED')
+            .order_by(Requisition.created_at.desc()).limit(50),
+        'user lpos newest first': select(LPO)
+            .join(Requisition, LPO.requisition_id == Requisition.id)
+            .where(Requisition.user_id == 7)
+            .order_by(LPO.created_at.desc()).limit(50),
+        'lpos for a requisition': select(LPO).where(LPO.requisition_id == 4242),
+        'line items for a product': select(RequisitionProduct)
+            .where(RequisitionProduct.product_id == 17),
+    }
+    dialect = create_engine('sqlite://').dialect
+    return {name: str(stmt.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+            for name, stmt in stmts.items()}
+
+
+def measure(conn, queries, repeat):
+    results = {}
+    for name, sql in queries.items():
+        plan = [row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql).fetchall()
+        results[name] = (plan, (time.perf_counter() - t0) / repeat * 1000)
+    return results
+
+
+def secondary_indexes():
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            yield index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--db', default='lpo_bench.db')
+    parser.add_argument('--requisitions', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    build(args.db, args.requisitions)
+    print(f'database ready in {time.perf_counter() - t0:.1f}s ({args.requisitions} requisitions)')
+
+    engine = create_engine(f'sqlite:///{args.db}')
+    queries = hot_queries()
+
+    with engine.begin() as conn:
+        for index in secondary_indexes():
+            conn.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+    conn = sqlite3.connect(args.db)
+    before = measure(conn, queries, args.repeat)
+    conn.close()
+
+    with engine.begin() as conn:
+        for index in secondary_indexes():
+            index.create(conn, checkfirst=True)
+        conn.execute(text('ANALYZE'))
+    conn = sqlite3.connect(args.db)
+    after = measure(conn, queries, args.repeat)
+    conn.close()
+
+    for name in queries:
+        (plan_b, ms_b), (plan_a, ms_a) = before[name], after[name]
+        print(f'\n== {name}')
+        print(f'   before: {ms_b:9.2f} ms  | ' + ' / '.join(plan_b))
+        print(f'   after:  {ms_a:9.2f} ms  | ' + ' / '.join(plan_a))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Compare the list serialization paths behind GET /requisitions and GET /lpos.
+
+    python benchmarks/serialization_bench.py --sizes 10000,100000 --out ser.json
+
+Uses api_bench.py's seed databases (built on first use). For every size the
+admin's unpaginated lists (/requisitions, /lpos, and /lpos with every
+?expand=) are produced in-process three ways:
+
+    orm+stdlib   ORM objects with eager loading, serialize_requisition /
+                 serialize_lpo, Flask's stdlib JSON provider (the old path)
+    rows+stdlib  column tuples in json_list batches, serialize_*_rows, stdlib
+    rows+orjson  the same with orjson (the routes now)
+
+and, end to end through the test client with the response cache emptied,
+with JSON_PROVIDER=stdlib and =orjson. Each case records the median time,
+the response size and throughput in MB/s, and the peak memory allocated
+while producing one response (tracemalloc, measured in a separate pass
+because tracing slows everything down).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from api_bench import HERE, bench_config, metadata, seeded_db  # noqa: E402
+from app import create_app  # noqa: E402
+from json_provider import OrJSONProvider  # noqa: E402
+from models import db, User, Requisition, LPO  # noqa: E402
+from streaming import json_list  # noqa: E402
+from serializers import (requisition_load_options, serialize_requisition, lpo_load_options,  # noqa: E402
+                         serialize_lpo, requisition_list_rows, serialize_requisition_rows,
+                         lpo_list_rows, serialize_lpo_rows)
+
+LPO_EXPANDS = {'lpos': set(), 'lpos_expanded': {'supplier', 'requisition', 'products'}}
+
+
+# ------------------- THE PATHS -------------------
+
+def orm_requisitions():
+    query = Requisition.query.options(*requisition_load_options())
+    return [serialize_requisition(r) for r in query.order_by(Requisition.created_at.desc()).all()]
+
+
+# the routes' own path: json_list() reads the rows in batches and serializes
+# each batch with its line items
+def row_requisitions():
+    rows = requisition_list_rows(Requisition.query).order_by(Requisition.created_at.desc())
+    return json_list(rows, serialize_requisition_rows)
+
+
+def orm_lpos(expand):
+    query = (LPO.query.join(Requisition, LPO.requisition_id == Requisition.id)
+             .options(*lpo_load_options(expand, requisition_joined=True)))
+    return [serialize_lpo(l, expand) for l in query.all()]
+
+
+def row_lpos(expand):
+    query = LPO.query.join(Requisition, LPO.requisition_id == Requisition.id)
+    return json_list(lpo_list_rows(query, expand), lambda batch: serialize_lpo_rows(batch, expand))
+
+
+# ------------------- MEASURING -------------------
+
+def measure(produce, repeat, warmup):
+    """Time produce() -> bytes; then one traced call for the allocation peak."""
+    samples = []
+    for i in range(warmup + repeat):
+        t0 = time.perf_counter()
+        body = produce()
+        elapsed = time.perf_counter() - t0
+        if i >= warmup:
+            samples.append(elapsed)
+
+    tracemalloc.start()
+    try:
+        produce()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(samples)
+    return {
+        'n': len(samples),
+        'median_ms': round(median * 1000, 2),
+        'min_ms': round(min(samples) * 1000, 2),
+        'bytes': len(body),
+        'mb_per_s': round(len(body) / median / 1e6, 2),
+        'peak_alloc_mb': round(peak / 1e6, 1),
+    }
+
+
+def in_process(app, repeat, warmup):
+    # json_list() hands back the whole list here; streaming is timed end to end
+    app.config['STREAM_MIN_ITEMS'] = 10 ** 12
+    providers = {'stdlib': DefaultJSONProvider(app), 'orjson': OrJSONProvider(app)}
+    paths = {'requisitions': {'orm': orm_requisitions, 'rows': row_requisitions}}
+    for name, expand in LPO_EXPANDS.items():
+        paths[name] = {'orm': lambda e=expand: orm_lpos(e), 'rows': lambda e=expand: row_lpos(e)}
+
+    results = {}
+    for name, builds in paths.items():
+        for path, provider in (('orm', 'stdlib'), ('rows', 'stdlib'), ('rows', 'orjson')):
+            def produce(build=builds[path], encoder=providers[provider]):
+                try:
+                    return encoder.response(build()).get_data()
+                finally:
+                    db.session.remove()  # no identity map carried into the next call
+            results[f'{name}/{path}+{provider}'] = measure(produce, repeat, warmup)
+            print(f'    {name}/{path}+{provider}: {results[f"{name}/{path}+{provider}"]}',
+                  file=sys.stderr)
+    return results
+
+
+def end_to_end(path, repeat, warmup):
+    results = {}
+    for provider in ('stdlib', 'orjson'):
+        config = type('Config', (bench_config(path),), {'JSON_PROVIDER': provider})
+        app = create_app(config)
+        with app.app_context():
+            admin = db.session.query(User).filter_by(role='admin').order_by(User.id).first()
+            auth = {'Authorization': 'Bearer ' + create_access_token(
+                identity=str(admin.id))}
+            db.session.remove()
+        client = app.test_client()
+        cache = app.extensions['cache']
+        for name, url in (('requisitions', '/requisitions'), ('lpos', '/lpos'),
+                          ('lpos_expanded', '/lpos?expand=supplier,requisition,products')):
+            def produce(url=url):
+                cache.backend.clear()
+                resp = client.get(url, headers=auth)
+                if resp.status_code != 200:
+                    raise RuntimeError(f'{resp.status_code}: {resp.get_data(as_text=True)[:200]}')
+                return resp.get_data()
+            results[f'http {name}/{provider}'] = measure(produce, repeat, warmup)
+            print(f'    http {name}/{provider}: {results[f"http {name}/{provider}"]}', file=sys.stderr)
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+    return results
+
+
+def run_size(size, args):
+    path = seeded_db(size, args.db_dir, args.workers)
+    app = create_app(bench_config(path))
+    with app.app_context():
+        results = in_process(app, args.repeat, args.warmup)
+        for engine in db.engines.values():
+            engine.dispose()
+    results.update(end_to_end(path, args.repeat, args.warmup))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='10000,100000', help='comma-separated requisition counts')
+    parser.add_argument('--repeat', type=int, default=5, help='measured calls per case')
+    parser.add_argument('--warmup', type=int, default=1, help='unmeasured calls per case')
+    parser.add_argument('--db-dir', default=HERE, help='where seed databases are kept')
+    parser.add_argument('--workers', type=int, default=None, help='bulk_seed processes')
+    parser.add_argument('--out', help='write results as JSON here (default: stdout)')
+    args = parser.parse_args()
+
+    report = {'meta': metadata(), 'results': {}}
+    for size in (int(s) for s in args.sizes.split(',')):
+        print(f'== {size} requisitions', file=sys.stderr)
+        report['results'][str(size)] = run_size(size, args)
+
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(payload + '\n')
+    else:
+        print(payload)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from itertools import chain
+
+from flask import Response, current_app, has_app_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from metrics import CACHE_LOOKUPS
+from models import User, Product, Supplier, Requisition, LPO, RequisitionProduct, LPOProduct
+
+# Which cached namespaces a committed write to each model makes stale.
+# Serialized requisitions/LPOs embed user, supplier and product fields,
+# hence the fan-out.
+INVALIDATES = {
+    Requisition:        ('requisitions', 'lpos', 'stats'),
+    RequisitionProduct: ('requisitions', 'stats'),
+    LPO:                ('lpos', 'stats'),
+    LPOProduct:         ('lpos', 'stats'),
+    User:               ('users', 'principals', 'requisitions', 'lpos', 'stats'),
+    Supplier:           ('suppliers', 'lpos', 'stats'),
+    Product:            ('products', 'requisitions', 'lpos'),
+}
+_BY_TABLE = {model.__table__: namespaces for model, namespaces in INVALIDATES.items()}
+
+
+# ------------------- BACKENDS -------------------
+
+class MemoryCache:
+    """Process-local cache with per-entry TTL and LRU eviction."""
+
+    def __init__(self, max_entries=10_000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def add(self, key, value):
+        """Set only if missing (no TTL); returns True if it was set."""
+        with self._lock:
+            if key in self._data:
+                return False
+            self._data[key] = (value, None)
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            value, expires = self._data.get(key, (0, None))
+            self._data[key] = (int(value) + 1, expires)
+            return int(value) + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    """Any redis-py compatible client: redis.Redis, fakeredis.FakeRedis, ...
+
+    TTLs are native; LRU eviction is Redis' own (maxmemory-policy allkeys-lru).
+    """
+
+    def __init__(self, client, prefix='lpo:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl or None)
+
+    def add(self, key, value):
+        return bool(self.client.set(self.prefix + key, value, nx=True))
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + '*'))
+
+
+def make_backend(config):
+    kind = (config.get('CACHE_BACKEND') or 'memory').lower()
+    if kind == 'memory':
+        return MemoryCache(config.get('CACHE_MAX_ENTRIES', 10_000))
+    if kind == 'redis':
+        import redis
+        return RedisCache(redis.Redis.from_url(config['CACHE_REDIS_URL']),
+                          config.get('CACHE_KEY_PREFIX', 'lpo:'))
+    if kind == 'fakeredis':
+        # in-process Redis stand-in for tests and local runs
+        import fakeredis
+        return RedisCache(fakeredis.FakeRedis(), config.get('CACHE_KEY_PREFIX', 'lpo:'))
+    raise ValueError(f'Unknown CACHE_BACKEND {kind!r}')
+
+
+# ------------------- NAMESPACES, HITS AND MISSES -------------------
+#
+# Every namespace has a generation number stored in the backend. Keys embed
+# it, so invalidating a namespace is one INCR: old entries simply become
+# unreachable and age out through TTL/LRU. With the Redis backend this is
+# shared by every worker process.
+
+class Cache:
+    def __init__(self, backend, default_ttl=60):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+
+    def generation(self, namespace):
+        key = f'gen:{namespace}'
+        value = self.backend.get(key)
+        if value is None:
+            # start from the clock so a wiped backend never reuses old generations
+            self.backend.add(key, int(time.time() * 1000))
+            value = self.backend.get(key)
+        return int(value)
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.generation(namespace)  # make sure it exists before INCR
+            self.backend.incr(f'gen:{namespace}')
+
+    def get(self, namespace, key, generation=None):
+        gen = self.generation(namespace) if generation is None else generation
+        value = self.backend.get(f'{namespace}:{gen}:{key}')
+        if value is None:
+            self._misses[namespace] += 1
+            CACHE_LOOKUPS.labels(namespace, 'miss').inc()
+        else:
+            self._hits[namespace] += 1
+            CACHE_LOOKUPS.labels(namespace, 'hit').inc()
+        return value
+
+    def set(self, namespace, key, value, generation, ttl=None):
+        self.backend.set(f'{namespace}:{generation}:{key}', value, ttl or self.default_ttl)
+
+    def remember_json(self, namespace, key, compute, ttl=None):
+        gen = self.generation(namespace)
+        raw = self.get(namespace, key, gen)
+        if raw is not None:
+            return json.loads(raw)
+        value = compute()
+        # stored under the generation read *before* computing: if a write
+        # landed meanwhile the entry is already unreachable, never stale
+        self.set(namespace, key, json.dumps(value), gen, ttl)
+        return value
+
+    def metrics(self):
+        namespaces = sorted(set(self._hits) | set(self._misses))
+        out = {}
+        for ns in namespaces:
+            hits, misses = self._hits[ns], self._misses[ns]
+            out[ns] = {'hits': hits, 'misses': misses,
+                       'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None}
+        return out
+
+
+def init_cache(app):
+    cfg = app.config
+    app.extensions['cache'] = Cache(make_backend(cfg), cfg.get('CACHE_DEFAULT_TTL', 60))
+
+
+def get_cache():
+    return current_app.extensions['cache']
+
+
+def cached_json_response(namespace, scope, build, ttl=None):
+    """Serve build() from the cache, keyed by namespace + scope + query string.
+
+    `scope` separates what different callers may see ('admin', 'user:7').
+    build() returns a JSON-able object, or a ready (response, status) tuple
+    for errors or a streamed response for long lists, which are passed
+    through uncached.
+    """
+    cache = get_cache()
+    key = f'{scope}:{request.query_string.decode()}'
+    gen = cache.generation(namespace)
+    body = cache.get(namespace, key, gen)
+    if body is None:
+        result = build()
+        if isinstance(result, (tuple, Response)):
+            return result
+        body = jsonify(result).get_data()
+        cache.set(namespace, key, body, gen, ttl)
+    return current_app.response_class(body, mimetype='application/json')
+
+
+# ------------------- INVALIDATION HOOKS -------------------
+#
+# Writes are tracked per session and applied on commit, so no reader can
+# re-cache pre-commit data after the invalidation.
+
+def _mark(session, namespaces):
+    session.info.setdefault('cache_stale', set()).update(namespaces)
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_flushed(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        namespaces = INVALIDATES.get(type(obj))
+        if namespaces:
+            _mark(session, namespaces)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_bulk(state):
+    # query.update()/delete() and Core insert()s bypass the flush
+    if state.is_select:
+        return
+    mapper = state.bind_mapper
+    if mapper is not None:
+        namespaces = INVALIDATES.get(mapper.class_)
+    else:
+        namespaces = _BY_TABLE.get(getattr(state.statement, 'table', None))
+    if namespaces:
+        _mark(state.session, namespaces)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    stale = session.info.pop('cache_stale', None)
+    if stale and has_app_context() and 'cache' in current_app.extensions:
+        current_app.extensions['cache'].invalidate(*stale)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    session.info.pop('cache_stale', None)
@@ -0,0 +1,151 @@
+import gzip
+import logging
+import zlib
+
+from flask import current_app, request
+
+# Negotiated response compression. A response of a type in COMPRESSIBLE is
+# encoded with the codec the client rates highest in Accept-Encoding, ties
+# going to COMPRESS_ENCODINGS order. Buffered bodies under
+# COMPRESS_MIN_BYTES go out as they are: the CPU and headers would cost
+# more than the bytes saved. Streamed bodies (exports, long lists) are
+# compressed chunk by chunk with a flush after each, so the client still
+# gets every chunk as soon as it is produced.
+#
+# br and zstd need the brotli / zstandard packages; without them those
+# encodings are not offered. A compressed response's ETag gets the coding
+# appended ("products-1a2b" -> "products-1a2b-gzip"): each encoding is a
+# different body, and a cache must not answer a client that can't decode
+# gzip with gzip bytes because the tags matched. Code comparing a tag the
+# client sent back (If-None-Match, If-Match) strips the suffix with
+# base_etag() first.
+
+COMPRESSIBLE = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+log = logging.getLogger('lpo.compression')
+
+
+class Gzip:
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        return gzip.compress(data, self.level, mtime=0)
+
+    def stream(self):
+        z = zlib.compressobj(self.level, zlib.DEFLATED, 31)  # wbits 31: gzip framing
+        return (lambda data: z.compress(data) + z.flush(zlib.Z_SYNC_FLUSH)), z.flush
+
+
+class Brotli:
+    def __init__(self, level):
+        import brotli
+        self.brotli = brotli
+        self.level = level
+
+    def compress(self, data):
+        return self.brotli.compress(data, quality=self.level)
+
+    def stream(self):
+        c = self.brotli.Compressor(quality=self.level)
+        return (lambda data: c.process(data) + c.flush()), c.finish
+
+
+class Zstd:
+    def __init__(self, level):
+        import zstandard
+        self.zstd = zstandard
+        self.level = level
+
+    # a ZstdCompressor must not be shared between threads, so one per response
+    def compress(self, data):
+        return self.zstd.ZstdCompressor(level=self.level).compress(data)
+
+    def stream(self):
+        c = self.zstd.ZstdCompressor(level=self.level).compressobj()
+        return (lambda data: c.compress(data) + c.flush(self.zstd.COMPRESSOBJ_FLUSH_BLOCK)), c.flush
+
+
+CODECS = {
+    'gzip': (Gzip, 'COMPRESS_GZIP_LEVEL'),
+    'br':   (Brotli, 'COMPRESS_BR_LEVEL'),
+    'zstd': (Zstd, 'COMPRESS_ZSTD_LEVEL'),
+}
+
+
+def base_etag(tag):
+    """`tag` without the -<coding> suffix that compressed responses add."""
+    base, sep, coding = tag.rpartition('-')
+    return base if sep and coding in CODECS else tag
+
+
+def _negotiate(codecs):
+    """(encoding, codec) the client accepts with the highest q, or None."""
+    accepted = request.accept_encodings
+    best, best_q = None, 0
+    for name, codec in codecs:  # preference order, so ties keep the earlier one
+        q = accepted[name]
+        if q > best_q:
+            best, best_q = (name, codec), q
+    return best
+
+
+def _compressed(chunks, codec):
+    compress, finish = codec.stream()
+    try:
+        for data in chunks:
+            if isinstance(data, str):
+                data = data.encode()
+            if data:
+                yield compress(data)
+        yield finish()
+    finally:
+        # closing the inner body ends its stream_with_context request context
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _compress_response(resp):
+    if resp.mimetype not in COMPRESSIBLE:
+        return resp
+    resp.vary.add('Accept-Encoding')
+    if (resp.status_code < 200 or resp.status_code in (204, 206, 304)
+            or 'Content-Encoding' in resp.headers):
+        return resp
+    chosen = _negotiate(current_app.extensions['compression'])
+    if chosen is None:
+        return resp
+    name, codec = chosen
+
+    if resp.is_streamed:
+        resp.response = _compressed(resp.response, codec)
+        resp.headers.pop('Content-Length', None)
+    else:
+        data = resp.get_data()
+        if len(data) < current_app.config.get('COMPRESS_MIN_BYTES', 1024):
+            return resp
+        resp.set_data(codec.compress(data))
+    resp.headers['Content-Encoding'] = name
+    tag, weak = resp.get_etag()
+    if tag:
+        resp.set_etag(f'{tag}-{name}', weak)
+    return resp
+
+
+def init_compression(app):
+    codecs = []
+    for name in app.config.get('COMPRESS_ENCODINGS', '').split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in CODECS:
+            raise ValueError(f'Unknown encoding {name!r} in COMPRESS_ENCODINGS')
+        cls, level_setting = CODECS[name]
+        try:
+            codecs.append((name, cls(app.config[level_setting])))
+        except ImportError as e:
+            log.warning('%s compression disabled: %s', name, e)
+    app.extensions['compression'] = codecs
+    if codecs:
+        app.after_request(_compress_response)
@@ -0,0 +1,96 @@
+from flask import request
+from sqlalchemy import select, update
+
+from compression import base_etag
+from models import db
+
+# Optimistic concurrency for requisitions and LPOs. Every change bumps the
+# row's `version`. A client that read version N sends If-Match: "N" (the
+# ETag of the single-item responses) or {"version": N} in the body, and its
+# write only lands if nobody changed the row since; otherwise 412.
+#
+# Status changes are checked against the transition table inside the same
+# UPDATE (WHERE status IN <allowed sources>), so of two admins racing to
+# approve and reject, exactly one wins and the other gets 409 -- with or
+# without a version, and without holding a lock between read and write.
+
+
+class WriteConflict(Exception):
+    def __init__(self, status_code, message, current=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.current = current or {}
+
+    def body(self):
+        return {'error': str(self), **self.current}
+
+
+def expected_version(data):
+    """Version the client last saw: If-Match, else body 'version'; None for unconditional.
+
+    Raises ValueError when either is malformed.
+    """
+    if request.if_match:
+        if request.if_match.star_tag:
+            return None
+        tags = {base_etag(t) for t in request.if_match.as_set()}  # "3-gzip" is version 3
+        if len(tags) != 1 or not next(iter(tags)).isdigit():
+            raise ValueError('If-Match must be a single version ETag, e.g. "3"')
+        return int(next(iter(tags)))
+    version = data.get('version') if isinstance(data, dict) else None
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+        raise ValueError('version must be an integer')
+    return version
+
+
+def compare_and_swap(model, row_id, expected=None, target=None, transitions=None):
+    """Bump one row's version, moving it to status `target` if given, in one UPDATE.
+
+    Returns the new version. Raises WriteConflict: 404 if the row doesn't
+    exist, 412 if its version isn't `expected`, 409 if `transitions` don't
+    allow its current status to become `target`.
+    """
+    conditions = [model.id == row_id]
+    values = {model.version: model.version + 1}
+    if expected is not None:
+        conditions.append(model.version == expected)
+    if target is not None:
+        sources = [src for src, targets in transitions.items() if target in targets]
+        conditions.append(model.status.in_(sources))
+        values[model.status] = target
+
+    version = db.session.execute(
+        update(model).where(*conditions).values(values)
+        .returning(model.version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if version is not None:
+        return version
+
+    # nothing matched: say why
+    row = db.session.query(model.status, model.version).filter(model.id == row_id).first()
+    name = f'{model.__name__} #{row_id}'
+    if row is None:
+        raise WriteConflict(404, f'{name} not found')
+    status, current = row
+    state = {'status': status.value, 'version': current}
+    if expected is not None and current != expected:
+        raise WriteConflict(412, f'{name} was changed by someone else; reload and retry', state)
+    raise WriteConflict(409, f'{name} cannot go from {status.value} to {target.value}', state)
+
+
+def lock_row(model, row_id):
+    """Lock one row until the transaction ends; False if it doesn't exist.
+
+    For writes that must read the row's current state before changing it.
+    """
+    if db.session.get_bind().dialect.name == 'sqlite':
+        # no row locks, and pysqlite only opens a transaction at the first
+        # write: a no-op UPDATE takes the database's write lock instead
+        return db.session.execute(
+            update(model).where(model.id == row_id).values(id=model.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+    return db.session.execute(
+        select(model.id).where(model.id == row_id).with_for_update()
+    ).first() is not None
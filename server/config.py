@@ -1,10 +1,109 @@
 import os
 
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _database_uri():
+    uri = os.environ.get('DATABASE_URL') or 'sqlite:///lpo_tracker.db'
+    # pin the driver we ship (psycopg 3); also accepts Heroku-style postgres://
+    for scheme in ('postgres://', 'postgresql://'):
+        if uri.startswith(scheme):
+            uri = 'postgresql+psycopg://' + uri[len(scheme):]
+    return uri
+
+
+def _engine_options(uri):
+    if uri.startswith('sqlite'):
+        # SQLite tuning happens through connect pragmas, see database.py
+        return {}
+    return {
+        'pool_size':     _env_int('DB_POOL_SIZE', 10),
+        'max_overflow':  _env_int('DB_MAX_OVERFLOW', 20),
+        'pool_timeout':  _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle':  _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+    }
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'default_secret_key'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///lpo_tracker.db'
+    SQLALCHEMY_DATABASE_URI = _database_uri()
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite only: WAL lets readers run alongside the single writer
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+    SQLITE_BUSY_TIMEOUT_MS = _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+
+
+    # response/KPI cache: 'memory' (per process), 'redis' (shared; set
+    # CACHE_REDIS_URL) or 'fakeredis' (in-process Redis stand-in for tests)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'memory'
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or 'redis://localhost:6379/0'
+    CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX') or 'lpo:'
+    CACHE_DEFAULT_TTL = _env_int('CACHE_DEFAULT_TTL', 60)
+    CACHE_MAX_ENTRIES = _env_int('CACHE_MAX_ENTRIES', 10_000)
+
+    # JSON encoder: 'orjson' (see json_provider.py) or 'stdlib' (Flask's own)
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'orjson'
+
+    # response compression: encodings by preference (br and zstd need the
+    # brotli / zstandard packages; empty turns compression off), the smallest
+    # body worth compressing, and a level per codec
+    COMPRESS_ENCODINGS = os.environ.get('COMPRESS_ENCODINGS', 'zstd,br,gzip')
+    COMPRESS_MIN_BYTES = _env_int('COMPRESS_MIN_BYTES', 1024)
+    COMPRESS_GZIP_LEVEL = _env_int('COMPRESS_GZIP_LEVEL', 6)
+    COMPRESS_BR_LEVEL = _env_int('COMPRESS_BR_LEVEL', 4)
+    COMPRESS_ZSTD_LEVEL = _env_int('COMPRESS_ZSTD_LEVEL', 3)
+
+    # unpaginated lists longer than this are streamed as chunked JSON (see streaming.py)
+    STREAM_MIN_ITEMS = _env_int('STREAM_MIN_ITEMS', 2000)
+
+    # seconds browsers may reuse /products and /suppliers before revalidating
+    CATALOG_MAX_AGE = _env_int('CATALOG_MAX_AGE', 0)
+
+    # werkzeug method string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000';
+    # stored hashes made with another method are upgraded on next login
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # POST /users/import hashes in the request with this cheaper method, so no
+    # plain-text password reaches the jobs table; the login upgrade replaces
+    # each imported hash with PASSWORD_HASH_METHOD on first sign-in
+    IMPORT_HASH_METHOD = os.environ.get('IMPORT_HASH_METHOD') or 'pbkdf2:sha256:1000'
+    LOGIN_HASH_WORKERS = _env_int('LOGIN_HASH_WORKERS', 0)   # 0 = half the CPUs
+    LOGIN_HASH_QUEUE = _env_int('LOGIN_HASH_QUEUE', 0)       # 0 = 4 per worker
+    LOGIN_HASH_TIMEOUT = _env_int('LOGIN_HASH_TIMEOUT', 10)
+    LOGIN_RATE_PER_MINUTE = _env_int('LOGIN_RATE_PER_MINUTE', 10)
+    LOGIN_BURST = _env_int('LOGIN_BURST', 5)
+
+
+    # statements at least this slow are logged (logger 'lpo.slow_query') and
+    # counted in /metrics; 0 turns the log off
+    SLOW_QUERY_MS = _env_int('SLOW_QUERY_MS', 500)
+
+    # background jobs (flask worker): seconds between queue polls, between
+    # heartbeats of a running job, and without one before it counts as dead
+    JOB_POLL_INTERVAL = _env_int('JOB_POLL_INTERVAL', 1)
+    JOB_HEARTBEAT_INTERVAL = _env_int('JOB_HEARTBEAT_INTERVAL', 30)
+    JOB_STALE_AFTER = _env_int('JOB_STALE_AFTER', 600)
+
+    # comma-separated list of allowed browser origins, '*' for any
+    CORS_ORIGINS = [o.strip() for o in (os.environ.get('CORS_ORIGINS') or '*').split(',')]
 
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'another-super-secret'
-    JWT_ACCESS_TOKEN_EXPIRES = 3600
\ No newline at end of file
+    # short-lived access tokens, renewed through POST /token/refresh instead
+    # of a fresh login (and password hash) every time
+    JWT_ACCESS_TOKEN_EXPIRES = _env_int('JWT_ACCESS_TOKEN_EXPIRES', 900)
+    JWT_REFRESH_TOKEN_EXPIRES = _env_int('JWT_REFRESH_TOKEN_EXPIRES', 30 * 24 * 3600)
+    # seconds a user's role/active flag may be served from cache
+    AUTH_CACHE_TTL = _env_int('AUTH_CACHE_TTL', 30)
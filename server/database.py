@@ -0,0 +1,24 @@
+from sqlalchemy import event
+
+from models import db
+
+
+def init_engine(app):
+    """Per-engine tuning that can't be expressed as create_engine() options."""
+    with app.app_context():
+        engine = db.engine
+
+    if engine.dialect.name != 'sqlite':
+        return
+
+    journal_mode = app.config['SQLITE_JOURNAL_MODE']
+    synchronous = app.config['SQLITE_SYNCHRONOUS']
+    busy_timeout = int(app.config['SQLITE_BUSY_TIMEOUT_MS'])
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        cursor.close()
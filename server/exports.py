@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+from itertools import groupby
+
+from models import db, User, Product, Supplier, Requisition, LPO, RequisitionProduct
+
+# Rows per server-side cursor fetch; memory stays bounded by this, not the table
+YIELD_PER = 1000
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+REQUISITION_COLUMNS = ('requisition_id', 'created_at', 'status', 'user_id', 'user_name',
+                       'notes', 'product_id', 'product_name', 'quantity', 'unit_price')
+LPO_COLUMNS = ('lpo_id', 'created_at', 'status', 'total_value', 'requisition_id',
+               'user_id', 'user_name', 'supplier_id', 'supplier_name')
+
+
+def _stream(query):
+    """Plain column tuples off a server-side cursor, no ORM identity map."""
+    return db.session.execute(
+        query.statement.execution_options(yield_per=YIELD_PER, stream_results=True))
+
+
+def requisition_rows(filters):
+    """One tuple per line item (requisitions without lines give one NULL line)."""
+    query = (db.session.query(
+                 Requisition.id, Requisition.created_at, Requisition.status,
+                 Requisition.user_id, User.name, Requisition.notes,
+                 RequisitionProduct.product_id, Product.name,
+                 RequisitionProduct.quantity, Product.price)
+             .join(User, Requisition.user_id == User.id)
+             .outerjoin(RequisitionProduct, RequisitionProduct.requisition_id == Requisition.id)
+             .outerjoin(Product, RequisitionProduct.product_id == Product.id)
+             .filter(*filters)
+             .order_by(Requisition.id, RequisitionProduct.product_id))
+    return _stream(query)
+
+
+def lpo_rows(filters):
+    query = (db.session.query(
+                 LPO.id, LPO.created_at, LPO.status, LPO.total_value, LPO.requisition_id,
+                 Requisition.user_id, User.name, LPO.supplier_id, Supplier.name)
+             .join(Requisition, LPO.requisition_id == Requisition.id)
+             .join(User, Requisition.user_id == User.id)
+             .join(Supplier, LPO.supplier_id == Supplier.id)
+             .filter(*filters)
+             .order_by(LPO.id))
+    return _stream(query)
+
+
+def _plain(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'value'):  # enums
+        return value.value
+    return value
+
+
+def csv_lines(columns, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_plain(v) for v in row])
+        # flush roughly every 64KB rather than per row
+        if buf.tell() > 65536:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _ndjson(objects):
+    chunk = []
+    size = 0
+    for obj in objects:
+        line = json.dumps(obj, separators=(',', ':')) + '\n'
+        chunk.append(line)
+        size += len(line)
+        if size > 65536:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    yield ''.join(chunk)
+
+
+def requisition_ndjson(rows):
+    """Regroup the (requisition-ordered) line rows into one object per requisition."""
+    def objects():
+        for rid, lines in groupby(rows, key=lambda r: r[0]):
+            lines = list(lines)
+            first = lines[0]
+            yield {
+                'id': rid,
+                'created_at': _plain(first[1]),
+                'status': _plain(first[2]),
+                'user_id': first[3],
+                'user_name': first[4],
+                'notes': first[5] or '',
+                'products': [{'id': l[6], 'name': l[7], 'quantity': l[8], 'price': l[9]}
+                             for l in lines if l[6] is not None],
+            }
+    return _ndjson(objects())
+
+
+def lpo_ndjson(rows):
+    return _ndjson({col: _plain(v) for col, v in zip(LPO_COLUMNS, row)} for row in rows)
@@ -0,0 +1,64 @@
+# gunicorn settings, all overridable from the environment.
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Sizing: start with one worker per core plus one. Each worker also runs
+# GUNICORN_THREADS request threads, which pay off because most requests wait
+# on the database and password hashing runs outside the GIL. Each thread
+# holds at most one connection, so keep threads <= DB_POOL_SIZE and
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) under the database's connection
+# limit. See README "Running in production".
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = _env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() + 1)
+threads = _env_int('GUNICORN_THREADS', 4)
+worker_class = 'gthread'
+
+# a worker silent this long is killed and replaced
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+# on SIGTERM, workers stop accepting and get this long to finish in-flight requests
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# recycle workers now and then so slow leaks can't accumulate; jitter keeps
+# them from all restarting together
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 10_000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 1_000)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or '-'
+errorlog = '-'
+
+# Each worker builds its own app (and so its own connection pool) after the
+# fork. Preloading would share one pool's sockets across processes.
+preload_app = False
+
+
+# Set PROMETHEUS_MULTIPROC_DIR to an empty writable directory so /metrics
+# aggregates every worker; it is wiped on each start.
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            os.remove(os.path.join(path, name))
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    app = getattr(worker, 'wsgi', None)  # unset if the worker failed to boot
+    if app is not None:
+        from app import shutdown
+        shutdown(app)
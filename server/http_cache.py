@@ -0,0 +1,49 @@
+from hashlib import blake2b
+
+from flask import current_app, jsonify, request
+
+from cache import get_cache
+from compression import base_etag
+
+# Catalogue collections served with ETags. The ETag is a digest of the
+# serialized body, so every worker process tags the same data the same way
+# whatever its cache generation, and a tag goes stale as soon as the body
+# it names would change (with the per-process memory backend, once the
+# answering worker's copy is rebuilt: within CACHE_DEFAULT_TTL). Bodies are
+# kept in the cache per generation, which every committed write to the
+# collection bumps (see cache.INVALIDATES), so a matching If-None-Match is
+# usually answered with 304 without running a query. Compressed responses
+# carry the tag with the coding appended (compression.py); the 304 repeats
+# whichever variant the client sent.
+
+
+def _cache_headers(resp, tag):
+    resp.set_etag(tag)
+    max_age = current_app.config.get('CATALOG_MAX_AGE', 0)
+    resp.headers['Cache-Control'] = f'public, max-age={max_age}, must-revalidate'
+    return resp
+
+
+def cached_collection_response(collection, build):
+    """Serve `build()` (a JSON-able object) with ETag/304 support.
+
+    The serialized body is kept per (generation, query string), so repeat
+    requests skip both the query and the JSON encoding.
+    """
+    cache = get_cache()
+    variant = request.query_string.decode()
+    gen = cache.generation(collection)
+    body = cache.get(collection, variant, gen)
+    if body is None:
+        result = build()
+        if isinstance(result, tuple):  # an error response, e.g. bad cursor
+            return result
+        body = jsonify(result).get_data()
+        cache.set(collection, variant, body, gen)
+
+    tag = f'{collection}-{blake2b(body, digest_size=12).hexdigest()}'
+    seen = next((t for t in request.if_none_match.as_set() if base_etag(t) == tag), None)
+    if seen or request.if_none_match.star_tag:
+        return _cache_headers(current_app.response_class(status=304), seen or tag)
+    resp = current_app.response_class(body, mimetype='application/json')
+    return _cache_headers(resp, tag)
@@ -0,0 +1,262 @@
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+
+from models import db, Job, JobStatus
+from seed import BULK_SEED_DEFAULTS, bulk_seed, seed_database
+
+# Background jobs. The `jobs` table is the queue: the web process inserts a
+# row and answers 202; `flask worker` processes claim rows one at a time with
+# a conditional UPDATE, so any number of workers can share the table without
+# running a job twice. Handlers are plain functions registered by kind.
+
+HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(kind, params=None, user_id=None):
+    """Queue a job and commit; returns the Job row."""
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    job = Job(kind=kind, params=params or {}, created_by=user_id)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+class JobContext:
+    """Handed to every handler for progress reporting."""
+
+    def __init__(self, job_id, min_interval=1.0):
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._last = 0.0
+
+    def progress(self, done, total=None, message=None):
+        """Record progress on the job row (throttled).
+
+        Written on its own connection so pollers see it before the job
+        finishes; on SQLite call it between the handler's commits, not
+        inside an open write transaction.
+        """
+        now = time.monotonic()
+        finished = total is not None and done >= total
+        if now - self._last < self.min_interval and not finished:
+            return
+        self._last = now
+        values = {'progress_done': done, 'heartbeat_at': datetime.utcnow()}
+        if total is not None:
+            values['progress_total'] = total
+        if message is not None:
+            values['message'] = message[:255]
+        _touch(self.job_id, values)
+
+
+def _touch(job_id, values):
+    jobs = Job.__table__
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(jobs.update().where(jobs.c.id == job_id).values(**values))
+    except OperationalError:
+        pass  # progress and heartbeats are advisory; never fail a job over them
+
+
+# ------------------- CLAIMING AND RUNNING -------------------
+
+def claim_next(worker_id):
+    """Atomically move the oldest queued job to running; None if the queue is empty."""
+    now = datetime.utcnow()
+    oldest = (db.select(Job.id).where(Job.status == JobStatus.QUEUED)
+              .order_by(Job.id).limit(1).scalar_subquery())
+    # the status check makes a race between workers harmless: the loser
+    # updates nothing and polls again
+    job_id = db.session.execute(
+        update(Job)
+        .where(Job.id == oldest, Job.status == JobStatus.QUEUED)
+        .values(status=JobStatus.RUNNING, worker=worker_id, attempts=Job.attempts + 1,
+                started_at=now, heartbeat_at=now)
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    db.session.commit()
+    return db.session.get(Job, job_id) if job_id is not None else None
+
+
+def fail_stale(stale_after):
+    """Fail running jobs whose worker stopped sending heartbeats.
+
+    They are not retried: handlers such as seeding are not idempotent, so
+    re-running half-finished work is worse than reporting it.
+    """
+    now = datetime.utcnow()
+    count = db.session.execute(
+        update(Job)
+        .where(Job.status == JobStatus.RUNNING,
+               Job.heartbeat_at < now - timedelta(seconds=stale_after))
+        .values(status=JobStatus.FAILED, finished_at=now,
+                error='Worker stopped responding before the job finished')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+def _finish(job_id, status, **values):
+    db.session.execute(
+        update(Job).where(Job.id == job_id)
+        .values(status=status, finished_at=datetime.utcnow(), **values)
+        .execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+def run_job(job):
+    """Run a claimed job to completion, recording the result or the error."""
+    job_id, kind, params = job.id, job.kind, dict(job.params or {})
+    handler = HANDLERS.get(kind)
+    try:
+        if handler is None:
+            raise LookupError(f'No handler for job kind {kind!r}')
+        result = handler(JobContext(job_id), **params)
+    except Exception:
+        db.session.rollback()
+        _finish(job_id, JobStatus.FAILED, error=traceback.format_exc(limit=5)[-4000:])
+        return False
+    _finish(job_id, JobStatus.SUCCEEDED, result=result)
+    return True
+
+
+class Worker:
+    """Poll the queue and run jobs one at a time until told to stop.
+
+    SIGTERM/SIGINT let the current job finish, then exit; a second signal
+    interrupts it.
+    """
+
+    def __init__(self, app, poll_interval=None, log=print):
+        cfg = app.config
+        self.app = app
+        self.poll_interval = poll_interval or cfg.get('JOB_POLL_INTERVAL', 1)
+        self.stale_after = cfg.get('JOB_STALE_AFTER', 600)
+        self.heartbeat_interval = cfg.get('JOB_HEARTBEAT_INTERVAL', 30)
+        self.id = f'{socket.gethostname()}:{os.getpid()}'
+        self.log = log
+        self.stopping = False
+
+    def _stop(self, signum, frame):
+        self.log(f'worker {self.id}: stopping after the current job')
+        self.stopping = True
+        signal.signal(signum, signal.SIG_DFL)
+
+    def _heartbeat(self, job_id, done):
+        # keeps long jobs that never report progress from looking stale
+        with self.app.app_context():
+            while not done.wait(self.heartbeat_interval):
+                _touch(job_id, {'heartbeat_at': datetime.utcnow()})
+
+    def run_one(self):
+        """Claim and run a single job; returns False if the queue was empty."""
+        with self.app.app_context():
+            job = claim_next(self.id)
+            if job is None:
+                return False
+            job_id = job.id
+            self.log(f'worker {self.id}: job {job_id} ({job.kind}) started')
+            done = threading.Event()
+            beat = threading.Thread(target=self._heartbeat, args=(job_id, done), daemon=True)
+            beat.start()
+            try:
+                ok = run_job(job)
+            finally:
+                done.set()
+                beat.join()
+                db.session.remove()
+            self.log(f"worker {self.id}: job {job_id} {'succeeded' if ok else 'failed'}")
+            return True
+
+    def run(self, once=False):
+        """Work until stopped; with once=True, until the queue is empty."""
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, self._stop)
+        self.log(f'worker {self.id}: polling every {self.poll_interval}s')
+        last_sweep = 0.0
+        while not self.stopping:
+            if time.monotonic() - last_sweep >= 60:
+                with self.app.app_context():
+                    if fail_stale(self.stale_after):
+                        self.log(f'worker {self.id}: marked stale jobs as failed')
+                    db.session.remove()
+                last_sweep = time.monotonic()
+            if self.run_one():
+                continue
+            if once:
+                break
+            deadline = time.monotonic() + self.poll_interval
+            while not self.stopping and time.monotonic() < deadline:
+                time.sleep(min(0.2, self.poll_interval))
+
+
+# ------------------- HANDLERS -------------------
+
+# POST /seed may set bulk_seed()'s numeric options (not workers, log, progress)
+BULK_SEED_OPTIONS = {name: type(default) for name, default in BULK_SEED_DEFAULTS.items()
+                     if type(default) in (int, float)}
+
+
+def parse_bulk_seed_options(data):
+    """Validate a POST /seed body for the bulk generator; raises ValueError."""
+    unknown = set(data) - set(BULK_SEED_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown option(s): {', '.join(sorted(unknown))}")
+    options = {}
+    for name, value in data.items():
+        kind = BULK_SEED_OPTIONS[name]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) \
+                or (kind is int and not isinstance(value, int)) or value < 0:
+            raise ValueError(f'{name} must be a non-negative {kind.__name__}')
+        if kind is float and value > 1:
+            raise ValueError(f'{name} must be between 0 and 1')
+        options[name] = value
+    if options.get('batch_size') == 0:
+        raise ValueError('batch_size must be positive')
+    return options
+
+
+@job_handler('seed')
+def _seed(ctx):
+    seed_database(db)
+    return {'message': 'Seeded successfully'}
+
+
+@job_handler('import_users')
+def _import_users(ctx, rows):
+    from user_import import import_user_rows
+    # the rows carry password hashes: don't keep a second copy on the job
+    db.session.execute(update(Job).where(Job.id == ctx.job_id)
+                       .values(params={'rows': len(rows)})
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+    created, errors = import_user_rows(rows, progress=ctx.progress)
+    return {'created': created, 'errors': errors}
+
+
+@job_handler('bulk_seed')
+def _bulk_seed(ctx, **options):
+    started = time.perf_counter()
+    bulk_seed(db, **options, log=current_app.logger.info, progress=ctx.progress)
+    return {'requisitions': options.get('requisitions', BULK_SEED_DEFAULTS['requisitions']),
+            'seconds': round(time.perf_counter() - started, 1)}
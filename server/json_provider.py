@@ -0,0 +1,44 @@
+from flask.json.provider import DefaultJSONProvider
+
+# JSON_PROVIDER = 'orjson' (the default) encodes responses and decodes
+# request bodies with orjson, several times faster than the stdlib json
+# behind Flask's own provider on the large list responses. The documents
+# are the same: keys sorted, Flask's fallbacks for dates, decimals, UUIDs
+# and dataclasses, compact outside debug mode. Only non-ASCII text goes
+# out as UTF-8 instead of \u escapes. 'stdlib' keeps Flask's provider.
+
+
+class OrJSONProvider(DefaultJSONProvider):
+    def __init__(self, app):
+        import orjson  # only needed when selected
+        super().__init__(app)
+        self._orjson = orjson
+
+    def _dump(self, obj, indent=False):
+        orjson = self._orjson
+        # datetimes go through Flask's default() so they stay HTTP dates
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._dump(obj, bool(kwargs.get('indent'))).decode()
+
+    def loads(self, s, **kwargs):
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dump(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+def init_json(app):
+    kind = app.config.get('JSON_PROVIDER', 'orjson')
+    if kind == 'orjson':
+        app.json = OrJSONProvider(app)
+    elif kind != 'stdlib':
+        raise ValueError(f'Unknown JSON_PROVIDER {kind!r}')
@@ -0,0 +1,105 @@
+import logging
+import os
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Histogram, generate_latest, multiprocess)
+from sqlalchemy import event
+
+from models import db
+
+# Per-process metrics. Under gunicorn set PROMETHEUS_MULTIPROC_DIR (see
+# gunicorn.conf.py) so /metrics reports the sum over every worker rather
+# than whichever worker happened to answer the scrape.
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time from request start to the end of the response body.',
+    ['method', 'route', 'status'])
+REQUEST_STATEMENTS = Histogram(
+    'http_request_db_statements', 'SQL statements executed per request.',
+    ['route'], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250))
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', 'Time spent in SQL statements per request.', ['route'])
+SLOW_QUERIES = Counter(
+    'db_slow_queries_total', 'Statements slower than SLOW_QUERY_MS.', ['route'])
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total', 'Response cache lookups.', ['namespace', 'result'])
+
+slow_query_log = logging.getLogger('lpo.slow_query')
+
+
+def _route():
+    if has_request_context():
+        return request.url_rule.rule if request.url_rule else '<unmatched>'
+    return '<no request>'  # CLI commands, background work
+
+
+# ------------------- REQUEST HOOKS -------------------
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+    g.db_statements = 0
+    g.db_time = 0.0
+
+
+def _finish_response(resp):
+    g.metrics_status = resp.status_code
+    if current_app.debug:
+        # streamed bodies are still running here, so this covers up to the first byte
+        app_ms = (time.perf_counter() - g.metrics_start) * 1000
+        resp.headers['Server-Timing'] = (
+            f'db;dur={g.db_time * 1000:.1f};desc="{g.db_statements} statements", '
+            f'app;dur={app_ms:.1f}')
+    return resp
+
+
+def _record_request(exc):
+    # teardown runs after a streamed body has been sent, so exports are
+    # measured end to end
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return
+    route = _route()
+    status = g.pop('metrics_status', 500)
+    REQUEST_LATENCY.labels(request.method, route, str(status)).observe(time.perf_counter() - start)
+    REQUEST_STATEMENTS.labels(route).observe(g.db_statements)
+    REQUEST_DB_TIME.labels(route).observe(g.db_time)
+
+
+def init_metrics(app):
+    app.before_request(_start_request)
+    app.after_request(_finish_response)
+    app.teardown_request(_record_request)
+
+    threshold = app.config.get('SLOW_QUERY_MS', 0) / 1000
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    for engine in engines:
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _start_statement(conn, cursor, statement, parameters, context, executemany):
+            context.metrics_start = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _end_statement(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context.metrics_start
+            in_request = has_request_context() and 'db_statements' in g
+            if in_request:
+                g.db_statements += 1
+                g.db_time += elapsed
+            if threshold and elapsed >= threshold:
+                route = _route()
+                SLOW_QUERIES.labels(route).inc()
+                # parameters are left out on purpose: they carry password hashes and emails
+                slow_query_log.warning('%.1f ms %s %s: %s', elapsed * 1000,
+                                       request.method if in_request else '-', route, statement)
+
+
+def metrics_response():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
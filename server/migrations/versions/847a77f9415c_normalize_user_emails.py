@@ -0,0 +1,26 @@
+"""Lower-case user emails and index lower(email)
+
+Revision ID: 847a77f9415c
+Revises: 6dfa11a8c153
+Create Date: 2026-10-18 10:41:55.319402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '847a77f9415c'
+down_revision = '6dfa11a8c153'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # fails loudly if two accounts differ only by case; merge them first
+    op.execute("UPDATE users SET email = lower(trim(email))")
+    op.create_index('ux_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('ux_users_email_lower', table_name='users')
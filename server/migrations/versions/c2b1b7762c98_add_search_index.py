@@ -0,0 +1,28 @@
+"""Add full-text search index
+
+Revision ID: c2b1b7762c98
+Revises: 21586947f922
+Create Date: 2026-10-18 15:20:41.274903
+
+"""
+from alembic import op
+
+from search import drop_tables, rebuild
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2b1b7762c98'
+down_revision = '21586947f922'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 tables on SQLite, tsvector + GIN on PostgreSQL; the DDL lives in
+    # search.py next to the statements that keep it filled. A later change
+    # to an index needs its own revision that calls rebuild() again.
+    rebuild(op.get_bind())
+
+
+def downgrade():
+    drop_tables(op.get_bind())
@@ -0,0 +1,28 @@
+"""Restore lower(email) index on users
+
+Revision ID: e2025b49170b
+Revises: 88033b8cbdd5
+Create Date: 2026-10-18 15:41:49.457755
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2025b49170b'
+down_revision = '88033b8cbdd5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite databases that ran 21586947f922 before it stopped rebuilding
+    # users lost this index (847a77f9415c); a no-op everywhere else
+    op.create_index('ux_users_email_lower', 'users', [sa.text('lower(email)')], unique=True,
+                    if_not_exists=True)
+
+
+def downgrade():
+    # the index belongs to 847a77f9415c and stays
+    pass
@@ -1,9 +1,11 @@
 from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import validates
 from enum import Enum
+from security import hash_password, is_password_hash
 
 db = SQLAlchemy()
 
@@ -14,31 +16,60 @@ class RequisitionStatus(Enum):
     APPROVED = 'approved'
     REJECTED = 'rejected'
 
+# Allowed requisition status changes: source -> targets
+REQUISITION_TRANSITIONS = {
+    RequisitionStatus.PENDING: {RequisitionStatus.APPROVED, RequisitionStatus.REJECTED},
+}
+
 class LPOStatus(Enum):
     PENDING = 'pending'
     DELIVERED = 'delivered'
     NOT_DELIVERED = 'not_delivered'
 
+LPO_TRANSITIONS = {
+    LPOStatus.PENDING: {LPOStatus.DELIVERED, LPOStatus.NOT_DELIVERED},
+    LPOStatus.DELIVERED: {LPOStatus.NOT_DELIVERED},
+    LPOStatus.NOT_DELIVERED: {LPOStatus.DELIVERED},
+}
+
+class JobStatus(Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+def normalize_email(value):
+    value = (value or '').strip().lower()
+    if "@" not in value or "." not in value:
+        raise ValueError("Invalid email format.")
+    return value
+
 # User model (for user authentication and roles)
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)  
-    password_hash = db.Column(db.String(100), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(50), nullable=False, default='user')  
+    is_active = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
+    # tokens issued at or before this moment are rejected (see auth.py)
+    tokens_valid_after = db.Column(db.DateTime)
     requisitions = db.relationship('Requisition', backref='user', lazy=True)
 
+    # emails are stored lower-cased; this also catches legacy mixed-case rows
+    __table_args__ = (
+        db.Index('ux_users_email_lower', db.func.lower(email), unique=True),
+    )
+
     @validates('email')
     def validate_email(self, _, value):
-        if "@" not in value or "." not in value:
-            raise ValueError("Invalid email format.")
-        return value
+        return normalize_email(value)
 
     @validates('password_hash')
     def validate_password(self, _, value):
-        if len(value) < 100:  
-            value = generate_password_hash(value)
+        if not is_password_hash(value):
+            value = hash_password(value)
         return value
 
     def check_password(self, password):
@@ -102,10 +133,20 @@ class Requisition(db.Model):
     status = db.Column(db.Enum(RequisitionStatus), default=RequisitionStatus.PENDING)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.Text)
+    # bumped by every change; the optimistic-concurrency token (see concurrency.py)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
 
     products = db.relationship('RequisitionProduct', back_populates='requisition', lazy=True)
 
+    # match the hot paths: per-user lists filtered by status, newest first,
+    # and the admin list (optionally filtered by status) newest first
+    __table_args__ = (
+        db.Index('ix_requisitions_user_id_status_created_at', 'user_id', 'status', 'created_at'),
+        db.Index('ix_requisitions_status_created_at', 'status', 'created_at'),
+        db.Index('ix_requisitions_created_at_id', 'created_at', 'id'),
+    )
+
     def __repr__(self):
         return f"<Requisition id={self.id} status='{self.status.value}' user_id={self.user_id}>"
 
@@ -119,12 +160,86 @@ class LPO(db.Model):
     status = db.Column(db.Enum(LPOStatus), default=LPOStatus.PENDING)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     total_value = db.Column(db.Float, nullable=False, default=0.0)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     products = db.relationship('LPOProduct', backref='lpo', lazy=True)
+    requisition = db.relationship('Requisition', backref='lpos', lazy=True)
+
+    __table_args__ = (
+        # one LPO per requisition, however many admins press the button at once
+        db.Index('ux_lpos_requisition_id', 'requisition_id', unique=True),
+        db.Index('ix_lpos_supplier_id', 'supplier_id'),
+        db.Index('ix_lpos_created_at_id', 'created_at', 'id'),
+        db.Index('ix_lpos_status_id', 'status', 'id'),
+    )
     
     def __repr__(self):
         return f"<LPO id={self.id} status='{self.status.value}' supplier_id={self.supplier_id}>total_value={self.total_value}>"
 
+# Individually revoked JWTs (logout), kept until they would have expired anyway
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RevokedToken jti='{self.jti}' user_id={self.user_id}>"
+
+# Background job (see jobs.py); the table doubles as the queue
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.Enum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer)
+    message = db.Column(db.String(255))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(100))
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    # workers poll for the oldest queued job
+    __table_args__ = (
+        db.Index('ix_jobs_status_id', 'status', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<Job id={self.id} kind='{self.kind}' status='{self.status.value}'>"
+
+# Spend rollups: LPO count and value per supplier / product, month of
+# lpos.created_at ('YYYY-MM') and LPO status. Derived data, maintained by
+# rollups.py as LPOs are written; reports read these instead of lpos.
+class SupplierSpend(db.Model):
+    __tablename__ = 'supplier_spend'
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id', ondelete='CASCADE'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    status = db.Column(db.Enum(LPOStatus), primary_key=True)
+    lpo_count = db.Column(db.Integer, nullable=False, default=0)
+    total_value = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<SupplierSpend supplier_id={self.supplier_id} month='{self.month}' status='{self.status.value}' total_value={self.total_value}>"
+
+class ProductSpend(db.Model):
+    __tablename__ = 'product_spend'
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    status = db.Column(db.Enum(LPOStatus), primary_key=True)
+    lpo_count = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    total_value = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<ProductSpend product_id={self.product_id} month='{self.month}' status='{self.status.value}' total_value={self.total_value}>"
+
 # Association table for many-to-many relationship between Requisition and Product
 class RequisitionProduct(db.Model):
     __tablename__ = 'requisition_product'
@@ -135,6 +250,11 @@ class RequisitionProduct(db.Model):
     product     = db.relationship('Product', back_populates ='requisition_products')
     requisition = db.relationship('Requisition', back_populates='products')
 
+    # the primary key covers lookups by requisition; this one covers by product
+    __table_args__ = (
+        db.Index('ix_requisition_product_product_id', 'product_id'),
+    )
+
 
     def __repr__(self):
         return f"<RequisitionProduct requisition_id={self.requisition_id} product_id={self.product_id} quantity={self.quantity}>"
@@ -147,9 +267,46 @@ class LPOProduct(db.Model):
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False)
 
+    product = db.relationship('Product', lazy=True)
+
     def __repr__(self):
         return f"<LPOProduct lpo_id={self.lpo_id} product_id={self.product_id} quantity={self.quantity} price={self.price}>"
 
 
+# Keep LPO.total_value equal to sum(quantity * price) of its lines by applying
+# each line change as a delta, so nothing has to re-sum lines at read time.
+# Bulk (Core) inserts of lines bypass these hooks and must set the total
+# themselves, as create_lpo does.
+
+def _add_to_lpo_total(connection, lpo_id, delta):
+    if delta:
+        lpos = LPO.__table__
+        connection.execute(lpos.update()
+                           .where(lpos.c.id == lpo_id)
+                           .values(total_value=lpos.c.total_value + delta))
+
+
+def _committed(target, attr):
+    hist = inspect(target).attrs[attr].history
+    return hist.deleted[0] if hist.deleted else getattr(target, attr)
+
+
+@event.listens_for(LPOProduct, 'after_insert')
+def _lpo_line_inserted(mapper, connection, target):
+    _add_to_lpo_total(connection, target.lpo_id, target.quantity * target.price)
+
+
+@event.listens_for(LPOProduct, 'after_update')
+def _lpo_line_updated(mapper, connection, target):
+    old = _committed(target, 'quantity') * _committed(target, 'price')
+    _add_to_lpo_total(connection, target.lpo_id, target.quantity * target.price - old)
+
+
+@event.listens_for(LPOProduct, 'after_delete')
+def _lpo_line_deleted(mapper, connection, target):
+    old = _committed(target, 'quantity') * _committed(target, 'price')
+    _add_to_lpo_total(connection, target.lpo_id, -old)
+
+
 
 
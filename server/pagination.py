@@ -0,0 +1,127 @@
+import base64
+import json
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def wants_page(args):
+    """Pagination is opt-in so existing clients keep getting plain arrays."""
+    return 'limit' in args or 'cursor' in args
+
+
+def parse_limit(args):
+    raw = args.get('limit', DEFAULT_LIMIT)
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise PaginationError('Invalid limit.')
+    if limit < 1:
+        raise PaginationError('Invalid limit.')
+    return min(limit, MAX_LIMIT)
+
+
+def parse_date_range(args, column):
+    """Turn ?from=&to= (ISO dates or datetimes) into filter clauses on column."""
+    clauses = []
+    for arg, op in (('from', column.__ge__), ('to', column.__le__)):
+        raw = args.get(arg)
+        if not raw:
+            continue
+        try:
+            value = datetime.fromisoformat(raw)
+        except ValueError:
+            raise PaginationError(f"Invalid '{arg}' date filter.")
+        # a bare date in ?to= means "up to the end of that day"
+        if arg == 'to' and len(raw) == 10:
+            value = value.replace(hour=23, minute=59, second=59, microsecond=999999)
+        clauses.append(op(value))
+    return clauses
+
+
+def parse_int_arg(args, name):
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        raise PaginationError(f'Invalid {name} filter.')
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.name
+    return value
+
+
+def _decode_value(column, value):
+    python_type = getattr(column.type, 'enum_class', None)
+    if python_type is not None:
+        return python_type[value]
+    if column.type.python_type is datetime:
+        return datetime.fromisoformat(value)
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, keys):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        return [_decode_value(col, v) for (col, _), v in zip(keys, values)]
+    except (ValueError, KeyError, TypeError):
+        raise PaginationError('Invalid cursor.')
+
+
+def _after(keys, values):
+    """WHERE clause selecting rows strictly after `values` in the key order."""
+    clauses = []
+    for i, (col, desc) in enumerate(keys):
+        cmp = col < values[i] if desc else col > values[i]
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, cmp))
+    return or_(*clauses)
+
+
+def keyset_page(query, keys, args):
+    """Fetch one page of `query` ordered by `keys`.
+
+    `keys` is a list of (column, descending) pairs; the last one must be
+    unique (the primary key) so the ordering is total. Returns the rows
+    and the cursor for the next page (None on the last page).
+    """
+    limit = parse_limit(args)
+    cursor = args.get('cursor')
+    if cursor:
+        query = query.filter(_after(keys, decode_cursor(cursor, keys)))
+
+    query = query.order_by(*[col.desc() if desc else col.asc() for col, desc in keys])
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, col.key) for col, _ in keys])
+    return rows, next_cursor
+
+
+def page_envelope(items, next_cursor):
+    return {'items': items, 'next_cursor': next_cursor}
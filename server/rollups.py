@@ -0,0 +1,196 @@
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from models import LPO, LPOProduct, Product, ProductSpend, Supplier, SupplierSpend
+
+# Spend per supplier and per product, by month and LPO status, kept in the
+# supplier_spend / product_spend tables so reports never scan lpos and
+# lpo_product. Whoever creates LPOs calls add_lpos() after inserting them;
+# whoever changes one reads its contribution() before the change and calls
+# replace_lpos() after it, in the same transaction. Each call upserts the
+# difference as a delta (count + value added to the bucket), so concurrent
+# writers add up instead of overwriting each other and a rollback takes
+# the rollup change with it. Buckets are written in key order, one
+# statement per table, so writers touching the same buckets lock them in
+# the same order rather than deadlocking. Emptied buckets stay behind with
+# zero counts; readers skip them.
+#
+# Core writes that bypass those calls (bulk_seed) end with rebuild();
+# check() compares the tables with a full recomputation. The upserts are
+# written for PostgreSQL and SQLite (ON CONFLICT) and MySQL/MariaDB (ON
+# DUPLICATE KEY); other dialects raise NotImplementedError.
+
+TOLERANCE = 0.01  # float sums drift in the last digits; money is rounded to cents
+
+
+def month_of(column, dialect):
+    if dialect == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    if dialect in ('mysql', 'mariadb'):
+        return func.date_format(column, '%Y-%m')
+    return func.strftime('%Y-%m', column)
+
+
+def _contributions(dialect, lpo_ids=None):
+    """(rollup model, key columns, SELECT of the LPOs' per-bucket sums) triples."""
+    month = month_of(LPO.created_at, dialect)
+    suppliers = (select(LPO.supplier_id, month, LPO.status,
+                        func.count(LPO.id), func.sum(LPO.total_value))
+                 .group_by(LPO.supplier_id, month, LPO.status))
+    products = (select(LPOProduct.product_id, month, LPO.status,
+                       func.count(LPOProduct.lpo_id), func.sum(LPOProduct.quantity),
+                       func.sum(LPOProduct.quantity * LPOProduct.price))
+                .join(LPO, LPO.id == LPOProduct.lpo_id)
+                .group_by(LPOProduct.product_id, month, LPO.status))
+    if lpo_ids is not None:
+        suppliers = suppliers.where(LPO.id.in_(lpo_ids))
+        products = products.where(LPO.id.in_(lpo_ids))
+    return [
+        (SupplierSpend, ['supplier_id', 'month', 'status', 'lpo_count', 'total_value'], suppliers),
+        (ProductSpend, ['product_id', 'month', 'status', 'lpo_count', 'quantity', 'total_value'], products),
+    ]
+
+
+def _bucket_order(key):
+    return key[0], key[1], key[2].value
+
+
+def _upsert(dialect, table, rows, keys, counters):
+    """INSERT `rows`, adding their `counters` to any bucket that already exists."""
+    if dialect in ('mysql', 'mariadb'):
+        stmt = mysql.insert(table).values(rows)
+        return stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in counters})
+    if dialect == 'postgresql':
+        stmt = postgresql.insert(table).values(rows)
+    elif dialect == 'sqlite':
+        stmt = sqlite.insert(table).values(rows)
+    else:
+        raise NotImplementedError(f'No rollup upsert for the {dialect} dialect')
+    return stmt.on_conflict_do_update(
+        index_elements=keys, set_={c: table.c[c] + stmt.excluded[c] for c in counters})
+
+
+def _apply(connection, changes):
+    """Add each (model, columns, {bucket key: deltas}) of `changes` to its table."""
+    for model, columns, deltas in changes:
+        rows = [dict(zip(columns, key + tuple(values)))
+                for key, values in sorted(deltas.items(), key=lambda kv: _bucket_order(kv[0]))
+                if any(values)]
+        if rows:
+            connection.execute(_upsert(connection.dialect.name, model.__table__, rows,
+                                       columns[:3], columns[3:]))
+
+
+def contribution(connection, lpo_ids):
+    """What the LPOs add to the rollups as they are now; see replace_lpos()."""
+    return [(model, columns, {tuple(r[:3]): tuple(r[3:]) for r in connection.execute(rows)})
+            for model, columns, rows in _contributions(connection.dialect.name, list(lpo_ids))]
+
+
+def add_lpos(connection, lpo_ids):
+    """Add the LPOs' current state to the rollups (after creating them)."""
+    lpo_ids = list(lpo_ids)
+    if lpo_ids:
+        _apply(connection, contribution(connection, lpo_ids))
+
+
+def replace_lpos(connection, lpo_ids, before):
+    """Swap `before`, the LPOs' contribution() ahead of a change, for their current one."""
+    changes = []
+    for (model, columns, old), (_, _, new) in zip(before, contribution(connection, lpo_ids)):
+        zero = (0,) * (len(columns) - 3)
+        deltas = {key: [(n or 0) - (o or 0) for n, o in zip(new.get(key, zero), old.get(key, zero))]
+                  for key in old.keys() | new.keys()}
+        changes.append((model, columns, deltas))
+    _apply(connection, changes)
+
+
+def rebuild(connection):
+    """Recompute both rollup tables from lpos/lpo_product; returns {table: rows}."""
+    counts = {}
+    for model, columns, rows in _contributions(connection.dialect.name):
+        connection.execute(delete(model))
+        connection.execute(insert(model).from_select(columns, rows))
+        counts[model.__tablename__] = connection.execute(
+            select(func.count()).select_from(model)).scalar()
+    return counts
+
+
+def check(connection):
+    """Buckets where the rollups disagree with a full recomputation; [] if none."""
+    differences = []
+    for model, columns, rows in _contributions(connection.dialect.name):
+        keys, values = columns[:3], columns[3:]
+        stored = {tuple(r[:3]): r[3:] for r in connection.execute(
+            select(*(model.__table__.c[c] for c in columns))) if any(r[3:])}
+        expected = {tuple(r[:3]): r[3:] for r in connection.execute(rows)}
+        for key in sorted(set(stored) | set(expected), key=lambda k: (k[0], k[1], k[2].value)):
+            have = stored.get(key, (0,) * len(values))
+            want = expected.get(key, (0,) * len(values))
+            if any(abs((h or 0) - (w or 0)) > TOLERANCE for h, w in zip(have, want)):
+                differences.append({
+                    'table': model.__tablename__,
+                    **dict(zip(keys, (key[0], key[1], key[2].value))),
+                    'stored': dict(zip(values, have)),
+                    'expected': dict(zip(values, want)),
+                })
+    return differences
+
+
+# ------------------- REPORTS -------------------
+
+def _filtered(query, model, months=(None, None), status=None):
+    query = query.where(model.lpo_count != 0)
+    start, end = months
+    if start:
+        query = query.where(model.month >= start)
+    if end:
+        query = query.where(model.month <= end)
+    if status is not None:
+        query = query.where(model.status == status)
+    return query
+
+
+def _money(value):
+    return round(value or 0.0, 2)
+
+
+def spend_by_status(connection, **filters):
+    """{status: {count, total_value}} over every LPO status."""
+    rows = connection.execute(_filtered(
+        select(SupplierSpend.status, func.sum(SupplierSpend.lpo_count),
+               func.sum(SupplierSpend.total_value)),
+        SupplierSpend, **filters).group_by(SupplierSpend.status))
+    return {status.value: {'count': count, 'total_value': _money(total)}
+            for status, count, total in rows}
+
+
+def spend_by_supplier(connection, **filters):
+    total = func.sum(SupplierSpend.total_value)
+    rows = connection.execute(_filtered(
+        select(Supplier.id, Supplier.name, func.sum(SupplierSpend.lpo_count), total)
+        .select_from(SupplierSpend).join(Supplier, Supplier.id == SupplierSpend.supplier_id),
+        SupplierSpend, **filters).group_by(Supplier.id, Supplier.name).order_by(total.desc()))
+    return [{'supplier_id': sid, 'supplier_name': name, 'count': count, 'total_value': _money(value)}
+            for sid, name, count, value in rows]
+
+
+def spend_by_product(connection, **filters):
+    total = func.sum(ProductSpend.total_value)
+    rows = connection.execute(_filtered(
+        select(Product.id, Product.name, func.sum(ProductSpend.lpo_count),
+               func.sum(ProductSpend.quantity), total)
+        .select_from(ProductSpend).join(Product, Product.id == ProductSpend.product_id),
+        ProductSpend, **filters).group_by(Product.id, Product.name).order_by(total.desc()))
+    return [{'product_id': pid, 'product_name': name, 'count': count, 'quantity': quantity,
+             'total_value': _money(value)}
+            for pid, name, count, quantity, value in rows]
+
+
+def spend_by_month(connection, **filters):
+    rows = connection.execute(_filtered(
+        select(SupplierSpend.month, func.sum(SupplierSpend.lpo_count),
+               func.sum(SupplierSpend.total_value)),
+        SupplierSpend, **filters).group_by(SupplierSpend.month).order_by(SupplierSpend.month))
+    return [{'month': month, 'count': count, 'total_value': _money(total)}
+            for month, count, total in rows]
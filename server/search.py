@@ -0,0 +1,264 @@
+import re
+
+from sqlalchemy import event, inspect, text
+
+from models import db, User, Product, Supplier, Requisition
+
+# Full-text search over the catalogue and requisition notes. Every searchable
+# model has a side table keyed by the model's id: an FTS5 virtual table on
+# SQLite, a tsvector with a GIN index on PostgreSQL. Mapper events rewrite a
+# row's entry inside the flush that writes the row, so the index commits and
+# rolls back with it. Core bulk inserts bypass the events: bulk_seed indexes
+# each batch itself, and `flask reindex` rebuilds everything.
+#
+# Every word of a query is matched as a prefix ("pap lee" finds "Printer
+# paper" requested by "Ann Lee"); single letters only as whole words, since
+# a one-letter prefix matches most of the index. The catalogue is ranked by
+# relevance; requisitions come newest first, which the index answers by
+# walking ids backwards and stopping at `limit`, however many rows match.
+
+MAX_TERMS = 8
+TABLE_PREFIX = 'search_'
+
+
+class SearchUnavailable(Exception):
+    pass
+
+
+class SearchIndex:
+    def __init__(self, model, columns, source=None, owner=None, watch=(), newest_first=False):
+        self.model = model
+        self.table = model.__tablename__
+        self.name = TABLE_PREFIX + self.table
+        self.columns = columns              # index column -> SQL expression over `source`
+        self.source = source or self.table
+        self.owner = owner                  # SQL expression of the owning user's id
+        self.watch = watch or tuple(columns)  # model attributes whose change means reindex
+        self.newest_first = newest_first
+
+
+INDEXES = {
+    'products': SearchIndex(
+        Product, {'name': 'products.name', 'description': 'products.description'}),
+    'suppliers': SearchIndex(
+        Supplier, {'name': 'suppliers.name', 'contact_name': 'suppliers.contact_name'}),
+    'requisitions': SearchIndex(
+        Requisition, {'notes': 'requisitions.notes', 'requester': 'users.name'},
+        source='requisitions JOIN users ON users.id = requisitions.user_id',
+        owner='requisitions.user_id', watch=('notes', 'user_id'), newest_first=True),
+}
+
+
+def include_name(name, type_, parent_names):
+    """Alembic filter: the search tables are managed by hand, not autogenerate."""
+    return not (type_ == 'table' and name.startswith(TABLE_PREFIX))
+
+
+def terms(q):
+    return re.findall(r'[^\W_]+', (q or '').lower())[:MAX_TERMS]
+
+
+def _is_prefix(word):
+    return len(word) > 1
+
+
+# ------------------- SQL PER DIALECT -------------------
+
+class SQLiteFTS:
+    def create(self, index):
+        columns = list(index.columns) + (['owner'] if index.owner else [])
+        return [f"CREATE VIRTUAL TABLE IF NOT EXISTS {index.name} USING fts5("
+                f"{', '.join(columns)}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"]
+
+    def fill(self, index, where):
+        columns, values = list(index.columns), list(index.columns.values())
+        if index.owner:
+            # the owner is indexed as a token ('u17') so owner AND words is one lookup
+            columns.append('owner')
+            values.append(f"'u' || {index.owner}")
+        return (f"INSERT OR REPLACE INTO {index.name} (rowid, {', '.join(columns)}) "
+                f"SELECT {index.table}.id, {', '.join(values)} FROM {index.source} WHERE {where}")
+
+    def remove(self, index):
+        return f'DELETE FROM {index.name} WHERE rowid = :id'
+
+    def optimize(self, index):
+        # merge the b-trees left by many small inserts into one; 3-4x faster reads
+        return [f"INSERT INTO {index.name} ({index.name}) VALUES ('optimize')"]
+
+    def query(self, index, words, owner_id):
+        phrases = ' '.join(f'"{w}"*' if _is_prefix(w) else f'"{w}"' for w in words)
+        match = f"{{{' '.join(index.columns)}}} : ({phrases})"
+        if owner_id is not None:
+            match = f'owner : u{int(owner_id)} AND {match}'
+        order = 'rowid DESC' if index.newest_first else 'rank'
+        return (f'SELECT rowid FROM {index.name} WHERE {index.name} MATCH :match '
+                f'ORDER BY {order} LIMIT :limit', {'match': match})
+
+
+class PostgresFTS:
+    def create(self, index):
+        owner = ', owner_id integer' if index.owner else ''
+        statements = [
+            f'CREATE TABLE IF NOT EXISTS {index.name} '
+            f'(id integer PRIMARY KEY{owner}, document tsvector NOT NULL)',
+            f'CREATE INDEX IF NOT EXISTS ix_{index.name}_document ON {index.name} USING gin (document)',
+        ]
+        if index.owner:
+            statements.append(
+                f'CREATE INDEX IF NOT EXISTS ix_{index.name}_owner_id ON {index.name} (owner_id)')
+        return statements
+
+    def fill(self, index, where):
+        # 'simple': names and part numbers, so no stemming or stop words
+        document = ' || '.join(
+            f"setweight(to_tsvector('simple', coalesce({expr}, '')), '{weight}')"
+            for expr, weight in zip(index.columns.values(), 'ABCD'))
+        columns, values, updates = ['id'], [f'{index.table}.id'], ['document = excluded.document']
+        if index.owner:
+            columns.append('owner_id')
+            values.append(index.owner)
+            updates.append('owner_id = excluded.owner_id')
+        return (f"INSERT INTO {index.name} ({', '.join(columns)}, document) "
+                f"SELECT {', '.join(values)}, {document} FROM {index.source} WHERE {where} "
+                f"ON CONFLICT (id) DO UPDATE SET {', '.join(updates)}")
+
+    def remove(self, index):
+        return f'DELETE FROM {index.name} WHERE id = :id'
+
+    def optimize(self, index):
+        return [f'ANALYZE {index.name}']
+
+    def query(self, index, words, owner_id):
+        tsquery = "to_tsquery('simple', :match)"
+        where = f'document @@ {tsquery}'
+        params = {'match': ' & '.join(f'{w}:*' if _is_prefix(w) else w for w in words)}
+        if owner_id is not None:
+            where += ' AND owner_id = :owner_id'
+            params['owner_id'] = owner_id
+        order = 'id DESC' if index.newest_first else f'ts_rank(document, {tsquery}) DESC'
+        return f'SELECT id FROM {index.name} WHERE {where} ORDER BY {order} LIMIT :limit', params
+
+
+DIALECTS = {'sqlite': SQLiteFTS(), 'postgresql': PostgresFTS()}
+
+
+def _dialect(connection):
+    return DIALECTS.get(connection.dialect.name)
+
+
+# ------------------- BUILDING -------------------
+
+def create_tables(connection):
+    sql = _dialect(connection)
+    if sql is None:
+        return
+    for index in INDEXES.values():
+        for statement in sql.create(index):
+            connection.execute(text(statement))
+
+
+def drop_tables(connection):
+    if _dialect(connection) is None:
+        return
+    for index in INDEXES.values():
+        connection.execute(text(f'DROP TABLE IF EXISTS {index.name}'))
+
+
+def index_rows(connection, kind, first_id=None, last_id=None):
+    """(Re)index the `kind` rows with ids in [first_id, last_id], or all of them."""
+    sql = _dialect(connection)
+    if sql is None:
+        return
+    index = INDEXES[kind]
+    where, params = '1 = 1', {}
+    if first_id is not None:
+        where, params = f'{index.table}.id BETWEEN :lo AND :hi', {'lo': first_id, 'hi': last_id}
+    connection.execute(text(sql.fill(index, where)), params)
+
+
+def optimize(connection):
+    """Compact the search tables after a bulk load."""
+    sql = _dialect(connection)
+    if sql is None:
+        return
+    for index in INDEXES.values():
+        for statement in sql.optimize(index):
+            connection.execute(text(statement))
+
+
+def rebuild(connection):
+    """Drop and refill every search table; returns {kind: rows indexed}."""
+    drop_tables(connection)
+    create_tables(connection)
+    counts = {}
+    for kind, index in INDEXES.items():
+        index_rows(connection, kind)
+        counts[kind] = connection.execute(text(f'SELECT COUNT(*) FROM {index.name}')).scalar()
+    optimize(connection)
+    return counts
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _created(metadata, connection, **kw):
+    create_tables(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _dropping(metadata, connection, **kw):
+    drop_tables(connection)
+
+
+# ------------------- KEEPING IN SYNC -------------------
+
+def _changed(target, attributes):
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in attributes)
+
+
+def _sync(index):
+    def written(mapper, connection, target):
+        sql = _dialect(connection)
+        if sql is not None:
+            connection.execute(text(sql.fill(index, f'{index.table}.id = :id')), {'id': target.id})
+
+    def updated(mapper, connection, target):
+        if _changed(target, index.watch):
+            written(mapper, connection, target)
+
+    def deleted(mapper, connection, target):
+        sql = _dialect(connection)
+        if sql is not None:
+            connection.execute(text(sql.remove(index)), {'id': target.id})
+
+    event.listen(index.model, 'after_insert', written)
+    event.listen(index.model, 'after_update', updated)
+    event.listen(index.model, 'after_delete', deleted)
+
+
+for _index in INDEXES.values():
+    _sync(_index)
+
+
+@event.listens_for(User, 'after_update')
+def _requester_renamed(mapper, connection, target):
+    # requisitions are searchable by the requester's name
+    sql = _dialect(connection)
+    if sql is not None and _changed(target, ('name',)):
+        connection.execute(text(sql.fill(INDEXES['requisitions'], 'requisitions.user_id = :id')),
+                           {'id': target.id})
+
+
+# ------------------- QUERYING -------------------
+
+def search_ids(kind, words, limit, owner_id=None):
+    """Ids of `kind` rows matching every word as a prefix, best (or newest) first.
+
+    `owner_id` restricts owned kinds (requisitions) to one user's rows.
+    """
+    connection = db.session.connection()
+    sql = _dialect(connection)
+    if sql is None:
+        raise SearchUnavailable(f'Search is not supported on {connection.dialect.name}')
+    statement, params = sql.query(INDEXES[kind], words, owner_id)
+    return [row_id for (row_id,) in connection.execute(text(statement), dict(params, limit=limit))]
@@ -0,0 +1,172 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# werkzeug's own default today; override with PASSWORD_HASH_METHOD
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+# what werkzeug stores: method with its parameters, salt, hex digest
+HASH_FORMAT = re.compile(
+    r'(?:scrypt:\d+:\d+:\d+|pbkdf2:sha(?:1|224|256|384|512):\d+)'
+    r'\$[A-Za-z0-9]+\$[0-9a-f]{40,128}')
+
+
+class HashPoolBusy(Exception):
+    """Every hashing slot is taken, or the hash outran LOGIN_HASH_TIMEOUT; the
+    caller should shed load (503)."""
+
+
+# ------------------- HASHING POLICY -------------------
+
+def hash_method():
+    try:
+        return current_app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD
+    except RuntimeError:  # outside an app context (scripts, shell)
+        return os.environ.get('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD
+
+
+@lru_cache(maxsize=8)
+def _canonical(method):
+    # werkzeug fills in defaults ('pbkdf2' -> 'pbkdf2:sha256:600000'); compare
+    # against what it would actually store
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=hash_method())
+
+
+def hash_passwords(passwords, method=None):
+    """Hash many passwords in parallel (bulk imports); keeps input order."""
+    method = method or hash_method()
+    workers = min(len(passwords), os.cpu_count() or 1) or 1
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwhash-bulk') as pool:
+        return list(pool.map(lambda pw: generate_password_hash(pw, method=method), passwords))
+
+
+def is_password_hash(value):
+    """True only for a complete werkzeug hash; anything else is a password to hash."""
+    return HASH_FORMAT.fullmatch(value) is not None
+
+
+# ------------------- BOUNDED VERIFICATION POOL -------------------
+#
+# scrypt/pbkdf2 release the GIL, so a thread pool gives real parallelism
+# while capping how many cores logins can occupy. The semaphore bounds the
+# queue too: when it's full we refuse instead of piling up work.
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool, _slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                cfg = current_app.config
+                workers = cfg.get('LOGIN_HASH_WORKERS') or max(1, (os.cpu_count() or 2) // 2)
+                queued = cfg.get('LOGIN_HASH_QUEUE') or workers * 4
+                _slots = threading.BoundedSemaphore(workers + queued)
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwhash')
+    return _pool, _slots
+
+
+def _run_bounded(fn, *args):
+    pool, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise HashPoolBusy()
+    try:
+        future = pool.submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=current_app.config.get('LOGIN_HASH_TIMEOUT', 10))
+    except FutureTimeout:
+        # the hash still finishes and frees its slot; this request stops waiting
+        raise HashPoolBusy() from None
+
+
+def shutdown_hash_pool():
+    """Let in-flight verifications finish, then drop the pool (worker exit)."""
+    global _pool, _slots
+    with _pool_lock:
+        pool, _pool, _slots = _pool, None, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def _verify_and_upgrade(pwhash, password, method):
+    if not check_password_hash(pwhash, password):
+        return False, None
+    new_hash = None
+    if pwhash.split('$', 1)[0] != _canonical(method):
+        new_hash = generate_password_hash(password, method=method)
+    return True, new_hash
+
+
+def verify_password(user, password):
+    """Check `password` off the request thread.
+
+    Returns True/False; when the stored hash predates the current policy the
+    user's hash is replaced (caller commits). Raises HashPoolBusy when the
+    pool is saturated or the check runs past LOGIN_HASH_TIMEOUT.
+    """
+    ok, new_hash = _run_bounded(_verify_and_upgrade, user.password_hash, password, hash_method())
+    if new_hash:
+        user.password_hash = new_hash
+    return ok
+
+
+# ------------------- LOGIN THROTTLING -------------------
+
+class LoginThrottle:
+    """Per-key token bucket: `rate` attempts per minute, bursts up to `burst`."""
+
+    def __init__(self, rate, burst, max_keys=100_000):
+        self.rate = rate / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """Spend one token. Returns 0 if allowed, else seconds until retry."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            if len(self._buckets) >= self.max_keys and key not in self._buckets:
+                self._prune(now)
+            self._buckets[key] = (tokens - 1, now)
+            return 0
+
+    def _prune(self, now):
+        # drop buckets that have refilled completely; they carry no state
+        full = self.burst / self.rate
+        for k in [k for k, (_, stamp) in self._buckets.items() if now - stamp >= full]:
+            del self._buckets[k]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+
+_throttle = None
+
+
+def login_throttle():
+    global _throttle
+    if _throttle is None:
+        cfg = current_app.config
+        _throttle = LoginThrottle(cfg.get('LOGIN_RATE_PER_MINUTE', 10), cfg.get('LOGIN_BURST', 5))
+    return _throttle
@@ -1,9 +1,22 @@
-from faker import Faker
+import inspect
+import os
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+from random import Random
+
+from sqlalchemy import false, func, insert, text, update
+from security import hash_password
+from search import index_rows, optimize as optimize_search
+from rollups import add_lpos, rebuild as rebuild_rollups
 from models import db, User, Product, Supplier, Requisition, LPO, RequisitionStatus, LPOStatus, RequisitionProduct, LPOProduct
 
-fake = Faker()
+# Faker takes about a second to import, so it's imported where it's used:
+# the app imports this module for BULK_SEED_DEFAULTS.
 
 def seed_database(db):
+    from faker import Faker
+    fake = Faker()
     try:
         # --- Users ---
         users = []
@@ -41,7 +54,7 @@ def seed_database(db):
             db.session.add(supplier)
             suppliers.append(supplier)
 
-        db.session.commit()
+        db.session.flush()
 
         # --- Requisitions + RequisitionProduct ---
         requisitions = []
@@ -52,7 +65,7 @@ def seed_database(db):
                 notes=fake.sentence()
             )
             db.session.add(req)
-            db.session.commit()
+            db.session.flush()  # assigns req.id without committing
             requisitions.append(req)
 
             for product in products[:2]:
@@ -63,12 +76,9 @@ def seed_database(db):
                 )
                 db.session.add(req_product)
 
-        db.session.commit()
-
         # Approve one requisition
         approved_req = requisitions[0]
         approved_req.status = RequisitionStatus.APPROVED
-        db.session.commit()
 
         # --- LPO + LPOProduct ---
         lpo = LPO(
@@ -77,7 +87,7 @@ def seed_database(db):
             status=LPOStatus.PENDING
         )
         db.session.add(lpo)
-        db.session.commit()
+        db.session.flush()
 
         for product in products[:2]:
             lpo_product = LPOProduct(
@@ -88,6 +98,8 @@ def seed_database(db):
             )
             db.session.add(lpo_product)
 
+        db.session.flush()
+        add_lpos(db.session.connection(), [lpo.id])
         db.session.commit()
 
         print("✅ Database seeded successfully!")
@@ -96,3 +108,215 @@ def seed_database(db):
         db.session.rollback()
         print(f"❌ Seeding error: {e}")
         raise e
+
+
+# ------------------- BULK / LOAD-TEST SEEDING -------------------
+#
+# Row generation (the Faker-heavy part) runs in a process pool; the parent
+# only does bulk INSERTs, one transaction per batch. Every batch seeds its
+# own Faker/Random from (seed, position of its first row), so the same
+# options always produce the same dataset regardless of the worker count.
+# Workers refer to rows by position in their batch; the parent reserves the
+# real ids from the database as it inserts the batch (_reserve_ids), so the
+# seeder can run beside live traffic.
+
+DEFAULT_PASSWORD = 'password123'
+SEED_START = datetime(2023, 1, 1)
+SEED_SPAN_SECONDS = 3 * 365 * 24 * 3600
+
+_worker_fake = None
+
+
+def _faker(seed):
+    global _worker_fake
+    if _worker_fake is None:
+        from faker import Faker
+        _worker_fake = Faker()
+    _worker_fake.seed_instance(seed)
+    return _worker_fake
+
+
+def _gen_users(task):
+    seed, start, count, admins, password_hash = task
+    f = _faker(seed * 1_000_003 + start)
+    rows = []
+    for n in range(start, start + count):
+        first, last = f.first_name(), f.last_name()
+        rows.append({
+            'name': f'{first} {last}',
+            # the id, known once reserved, keeps emails unique across runs
+            'email': f'{first}.{last}.{{id}}@{f.free_email_domain()}'.lower(),
+            'password_hash': password_hash,
+            'role': 'admin' if n < admins else 'user',
+        })
+    return rows
+
+
+def _gen_requisitions(task):
+    (seed, start, count, user_ids, product_prices, supplier_ids,
+     max_lines, approved_ratio, lpo_ratio) = task
+    f = _faker(seed * 1_000_003 + start)
+    rnd = Random(seed * 1_000_003 + start)
+    product_ids = list(product_prices)
+    max_lines = min(max_lines, len(product_ids))  # a requisition lists a product once
+    statuses = (RequisitionStatus.PENDING, RequisitionStatus.REJECTED)
+    lpo_statuses = list(LPOStatus)
+
+    # requisition_id is the requisition's position in `reqs` until the parent assigns ids
+    reqs, lines, lpos = [], [], []
+    for i in range(count):
+        created = SEED_START + timedelta(seconds=rnd.randrange(SEED_SPAN_SECONDS))
+        approved = rnd.random() < approved_ratio
+        reqs.append({
+            'user_id': rnd.choice(user_ids),
+            'status': RequisitionStatus.APPROVED if approved else rnd.choice(statuses),
+            'created_at': created,
+            'notes': f.sentence(),
+        })
+        req_lines = [(pid, rnd.randint(1, 10))
+                     for pid in rnd.sample(product_ids, rnd.randint(1, max_lines))]
+        lines.extend({'requisition_id': i, 'product_id': pid, 'quantity': qty}
+                     for pid, qty in req_lines)
+
+        if approved and rnd.random() < lpo_ratio:
+            lpos.append({
+                'requisition_id': i,
+                'supplier_id': rnd.choice(supplier_ids),
+                'status': rnd.choice(lpo_statuses),
+                'created_at': created + timedelta(days=rnd.randint(1, 14)),
+                'total_value': round(sum(product_prices[pid] * qty for pid, qty in req_lines), 2),
+                'lines': [{'product_id': pid, 'quantity': qty, 'price': product_prices[pid]}
+                          for pid, qty in req_lines],
+            })
+    return reqs, lines, lpos
+
+
+def _reserve_ids(db, model, count):
+    """`count` new ids for `model` that no concurrent insert can take.
+
+    PostgreSQL hands them out from the id sequence. SQLite has none: there a
+    no-op UPDATE takes the database's write lock, which keeps max(id) + 1
+    onwards free until the caller commits.
+    """
+    table = model.__table__
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return list(db.session.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                 "FROM generate_series(1, :count) ORDER BY 1"),
+            {'table': table.name, 'count': count}).scalars())
+    db.session.execute(update(table).where(false()).values(id=table.c.id))
+    first = (db.session.query(func.max(table.c.id)).scalar() or 0) + 1
+    return list(range(first, first + count))
+
+
+def _batches(total, size):
+    for lo in range(0, total, size):
+        yield lo, min(size, total - lo)
+
+
+def bulk_seed(db, users=100, products=200, suppliers=20, requisitions=10_000,
+              max_lines=5, approved_ratio=0.5, lpo_ratio=0.8,
+              batch_size=5_000, workers=None, admins=1, seed=42, log=print, progress=None):
+    """Generate a large, reproducible dataset with batched bulk inserts.
+
+    All generated users share the password DEFAULT_PASSWORD; the first
+    `admins` of them get the admin role. `progress(done, total)` is called
+    after every committed batch of requisitions.
+    """
+    from faker import Faker
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    fake = Faker()
+    fake.seed_instance(seed)
+    password_hash = hash_password(DEFAULT_PASSWORD)
+
+    pool = Pool(workers) if workers > 1 else None
+    imap = pool.imap if pool else map
+    try:
+        # --- Products & suppliers: small, generated inline ---
+        # Core inserts skip the search index's mapper events, hence index_rows
+        if products:
+            pids = _reserve_ids(db, Product, products)
+            db.session.execute(insert(Product.__table__), [{
+                'id': pid,
+                'name': fake.word().capitalize(),
+                'price': round(fake.pyfloat(left_digits=3, right_digits=2, positive=True), 2),
+                'description': fake.sentence(),
+            } for pid in pids])
+            index_rows(db.session.connection(), 'products', pids[0], pids[-1])
+        if suppliers:
+            sids = _reserve_ids(db, Supplier, suppliers)
+            db.session.execute(insert(Supplier.__table__), [{
+                'id': sid,
+                'name': fake.company(),
+                'contact_name': fake.name(),
+                'contact_email': fake.company_email(),
+                'contact_phone': fake.msisdn()[:10],
+                'address': fake.address(),
+            } for sid in sids])
+            index_rows(db.session.connection(), 'suppliers', sids[0], sids[-1])
+        db.session.commit()
+
+        product_prices = dict(db.session.query(Product.id, Product.price))
+        supplier_ids = [sid for (sid,) in db.session.query(Supplier.id)]
+
+        # --- Users ---
+        tasks = [(seed, lo, n, admins, password_hash) for lo, n in _batches(users, batch_size)]
+        for rows in imap(_gen_users, tasks):
+            for row, uid in zip(rows, _reserve_ids(db, User, len(rows))):
+                row['id'] = uid
+                row['email'] = row['email'].format(id=uid)
+            db.session.execute(insert(User.__table__), rows)
+            db.session.commit()
+        user_ids = [uid for (uid,) in db.session.query(User.id)]
+        log(f'users: {users} inserted')
+
+        # --- Requisitions, line items, LPOs ---
+        tasks = [(seed, lo, n, user_ids, product_prices, supplier_ids,
+                  max_lines, approved_ratio, lpo_ratio)
+                 for lo, n in _batches(requisitions, batch_size)]
+        done = n_lpos = 0
+        for reqs, lines, lpos in imap(_gen_requisitions, tasks):
+            rids = _reserve_ids(db, Requisition, len(reqs))
+            for req, rid in zip(reqs, rids):
+                req['id'] = rid
+            for line in lines:
+                line['requisition_id'] = rids[line['requisition_id']]
+            lpo_lines = []
+            for lpo, lpo_id in zip(lpos, _reserve_ids(db, LPO, len(lpos)) if lpos else ()):
+                lpo['id'] = lpo_id
+                lpo['requisition_id'] = rids[lpo['requisition_id']]
+                lpo_lines.extend(dict(line, lpo_id=lpo_id) for line in lpo.pop('lines'))
+            db.session.execute(insert(Requisition.__table__), reqs)
+            db.session.execute(insert(RequisitionProduct.__table__), lines)
+            if lpos:
+                db.session.execute(insert(LPO.__table__), lpos)
+                db.session.execute(insert(LPOProduct.__table__), lpo_lines)
+            index_rows(db.session.connection(), 'requisitions', reqs[0]['id'], reqs[-1]['id'])
+            db.session.commit()
+            done += len(reqs)
+            n_lpos += len(lpos)
+            log(f'requisitions: {done}/{requisitions}  lpos: {n_lpos}  '
+                f'({done / (time.perf_counter() - started):,.0f} req/s)')
+            if progress:
+                progress(done, requisitions)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    optimize_search(db.session.connection())
+    # LPOs went in through Core, past the incremental rollup updates
+    rebuild_rollups(db.session.connection())
+    db.session.commit()
+
+    log(f'✅ Bulk seed finished in {time.perf_counter() - started:.1f}s')
+
+
+# bulk_seed()'s keyword defaults; `flask seed`, POST /seed and the bulk_seed
+# job take theirs from here
+BULK_SEED_DEFAULTS = {name: p.default for name, p in inspect.signature(bulk_seed).parameters.items()
+                      if p.default is not inspect.Parameter.empty}
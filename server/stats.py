@@ -0,0 +1,88 @@
+from sqlalchemy import func
+
+from cache import get_cache
+from models import db, User, Supplier, Requisition, LPO
+from rollups import month_of, spend_by_month, spend_by_status, spend_by_supplier
+
+
+def _user_lpo_stats(lpo_base):
+    """by_status, by_supplier and by_month over the LPOs in `lpo_base`, aggregated live."""
+    lpo_by_status = {
+        status.value: {'count': count, 'total_value': round(total or 0.0, 2)}
+        for status, count, total in lpo_base
+            .with_entities(LPO.status, func.count(LPO.id), func.sum(LPO.total_value))
+            .group_by(LPO.status)
+    }
+
+    lpo_by_supplier = [
+        {'supplier_id': sid, 'supplier_name': name,
+         'count': count, 'total_value': round(total or 0.0, 2)}
+        for sid, name, count, total in lpo_base
+            .join(Supplier, LPO.supplier_id == Supplier.id)
+            .with_entities(Supplier.id, Supplier.name,
+                           func.count(LPO.id), func.sum(LPO.total_value))
+            .group_by(Supplier.id, Supplier.name)
+            .order_by(func.sum(LPO.total_value).desc())
+    ]
+
+    month = month_of(LPO.created_at, db.session.get_bind().dialect.name).label('month')
+    spend_by_month_rows = [
+        {'month': m, 'count': count, 'total_value': round(total or 0.0, 2)}
+        for m, count, total in lpo_base
+            .with_entities(month, func.count(LPO.id), func.sum(LPO.total_value))
+            .group_by(month)
+            .order_by(month)
+    ]
+    return lpo_by_status, lpo_by_supplier, spend_by_month_rows
+
+
+def compute_stats(user_id=None):
+    """KPIs for the dashboards, all as GROUP BY aggregates.
+
+    `user_id=None` means the admin view over every row; otherwise only the
+    given user's requisitions and the LPOs raised against them count.
+    """
+    req_q = db.session.query(Requisition.status, func.count(Requisition.id))
+    lpo_base = db.session.query(LPO).join(Requisition, LPO.requisition_id == Requisition.id)
+    if user_id is not None:
+        req_q = req_q.filter(Requisition.user_id == user_id)
+        lpo_base = lpo_base.filter(Requisition.user_id == user_id)
+
+    req_by_status = {status.value: count
+                     for status, count in req_q.group_by(Requisition.status)}
+
+    if user_id is None:
+        # every LPO counts: read the spend rollups instead of scanning lpos
+        connection = db.session.connection()
+        lpo_by_status = spend_by_status(connection)
+        lpo_by_supplier = spend_by_supplier(connection)
+        spend_by_month_rows = spend_by_month(connection)
+    else:
+        lpo_by_status, lpo_by_supplier, spend_by_month_rows = _user_lpo_stats(lpo_base)
+
+    out = {
+        'requisitions': {
+            'total': sum(req_by_status.values()),
+            'by_status': req_by_status,
+        },
+        'lpos': {
+            'total': sum(v['count'] for v in lpo_by_status.values()),
+            'total_value': round(sum(v['total_value'] for v in lpo_by_status.values()), 2),
+            'by_status': lpo_by_status,
+            'by_supplier': lpo_by_supplier,
+        },
+        'spend_by_month': spend_by_month_rows,
+    }
+    if user_id is None:
+        out['users'] = {'total': db.session.query(func.count(User.id)).scalar()}
+    return out
+
+
+def get_stats(user_id=None):
+    """compute_stats() memoized in the 'stats' cache namespace.
+
+    The namespace is invalidated whenever a write to a requisition, LPO,
+    supplier or user commits (see cache.INVALIDATES).
+    """
+    scope = 'admin' if user_id is None else f'user:{user_id}'
+    return get_cache().remember_json('stats', scope, lambda: compute_stats(user_id))
@@ -0,0 +1,40 @@
+from itertools import chain, islice
+
+from flask import current_app, stream_with_context
+
+# Unpaginated lists can run to hundreds of thousands of items. Up to
+# STREAM_MIN_ITEMS they are built whole and returned as usual (and cached);
+# past that the array is sent as chunked JSON, BATCH_SIZE items at a time
+# off a server-side cursor. The first byte then leaves after one batch,
+# however long the list is, and memory stays bounded by a batch. Streamed
+# lists are not cached. The bytes are the same as the whole-list response.
+
+BATCH_SIZE = 1000
+
+
+def _batches(rows):
+    rows = iter(rows)
+    while batch := list(islice(rows, BATCH_SIZE)):
+        yield batch
+
+
+def json_list(query, serialize):
+    """Every row of `query`, through serialize(batch of rows) -> list of dicts.
+
+    Returns the list itself when it is short, else a streamed response.
+    """
+    rows = iter(query.yield_per(BATCH_SIZE))
+    limit = current_app.config.get('STREAM_MIN_ITEMS', 2000)
+    head = list(islice(rows, limit + 1))
+    if len(head) <= limit:
+        return [item for batch in _batches(head) for item in serialize(batch)]
+
+    def generate():
+        dumps = current_app.json.dumps
+        yield '['
+        for i, batch in enumerate(_batches(chain(head, rows))):
+            body = dumps(serialize(batch), separators=(',', ':'))[1:-1]
+            yield body if i == 0 else ',' + body
+        yield ']\n'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
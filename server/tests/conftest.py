@@ -0,0 +1,84 @@
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app import create_app
+from auth import issue_access_token
+from config import Config
+from models import db, User
+
+
+def make_config(uri, engine_options=None):
+    return type('TestConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options or {},
+        'CACHE_BACKEND': 'memory',
+        'SLOW_QUERY_MS': 0,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1',
+        'JWT_SECRET_KEY': 'test-secret-key-long-enough-for-hs256',
+        # the login throttle is process-wide: every test logs in from one address
+        'LOGIN_RATE_PER_MINUTE': 10 ** 9,
+        'LOGIN_BURST': 10 ** 9,
+    })
+
+
+# Every test that uses `app` runs on a fresh SQLite file and, when
+# DATABASE_URL points at PostgreSQL, again on that server inside a throwaway
+# schema (dropped at the end of the session, so the database's own tables are
+# never touched). Without a reachable PostgreSQL those cases are skipped.
+
+@pytest.fixture(scope='session')
+def postgres_schema():
+    uri = Config.SQLALCHEMY_DATABASE_URI  # DATABASE_URL, driver pinned by Config
+    if not uri.startswith('postgresql'):
+        pytest.skip('DATABASE_URL does not point at PostgreSQL')
+    engine = create_engine(uri)
+    schema = f'test_{uuid.uuid4().hex[:12]}'
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f'CREATE SCHEMA {schema}'))
+    except exc.OperationalError as e:
+        engine.dispose()
+        pytest.skip(f'PostgreSQL at DATABASE_URL is unreachable: {e.orig}')
+    yield uri, schema
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA {schema} CASCADE'))
+    engine.dispose()
+
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def database(request, tmp_path):
+    """(SQLAlchemy URI, engine options) of the database under test."""
+    if request.param == 'sqlite':
+        return f'sqlite:///{tmp_path / "test.db"}', {}
+    uri, schema = request.getfixturevalue('postgres_schema')
+    return uri, {'connect_args': {'options': f'-csearch_path={schema}'}}
+
+
+@pytest.fixture
+def app(database):
+    app = create_app(make_config(*database))
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def make_user(role='user', name='Test User'):
+    user = User(name=name, email=f'{name.replace(" ", ".").lower()}@example.com',
+                password_hash='unused', role=role)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def auth_headers(user):
+    return {'Authorization': 'Bearer ' + issue_access_token({'id': user.id, 'role': user.role})}
@@ -0,0 +1,103 @@
+"""Both cache backends must behave the same behind Cache: entries expire
+after their TTL, a namespace is invalidated by bumping its generation, and
+the in-process backend evicts the least recently used entry when full."""
+import time
+import uuid
+
+import pytest
+
+from cache import Cache, MemoryCache, RedisCache
+from models import db, Product, Supplier
+
+MAX_ENTRIES = 50
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend(request):
+    if request.param == 'memory':
+        yield MemoryCache(max_entries=MAX_ENTRIES)
+        return
+    fakeredis = pytest.importorskip('fakeredis')
+    backend = RedisCache(fakeredis.FakeRedis(), prefix=f'test:{uuid.uuid4().hex}:')
+    yield backend
+    backend.clear()
+
+
+def text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def test_entries_expire_after_their_ttl(backend):
+    backend.set('short', 'a', ttl=1)
+    backend.set('forever', 'b')
+    assert text(backend.get('short')) == 'a'
+    time.sleep(1.1)
+    assert backend.get('short') is None
+    assert text(backend.get('forever')) == 'b'
+
+
+def test_add_and_incr(backend):
+    assert backend.add('counter', 5)
+    assert not backend.add('counter', 9)
+    assert backend.incr('counter') == 6
+    assert int(backend.get('counter')) == 6
+
+
+def test_least_recently_used_entry_is_evicted(backend):
+    if not isinstance(backend, MemoryCache):
+        pytest.skip("Redis evicts under its own maxmemory-policy, which fakeredis doesn't emulate")
+    for n in range(MAX_ENTRIES):
+        backend.set(f'k{n}', n)
+    backend.get('k0')  # k1 is now the least recently used
+    backend.set('new', 'x')
+    assert len(backend) == MAX_ENTRIES
+    assert backend.get('k1') is None
+    assert backend.get('k0') == 0 and backend.get('k2') == 2 and backend.get('new') == 'x'
+
+
+def test_invalidate_bumps_only_its_namespace(backend):
+    cache = Cache(backend, default_ttl=60)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return {'value': value}
+
+    assert cache.remember_json('products', 'all', lambda: compute(1)) == {'value': 1}
+    assert cache.remember_json('suppliers', 'all', lambda: compute(2)) == {'value': 2}
+    assert cache.remember_json('products', 'all', lambda: compute(3)) == {'value': 1}
+
+    before = cache.generation('products')
+    cache.invalidate('products')
+    assert cache.generation('products') == before + 1
+    assert cache.remember_json('products', 'all', lambda: compute(4)) == {'value': 4}
+    assert cache.remember_json('suppliers', 'all', lambda: compute(5)) == {'value': 2}
+    assert calls == [1, 2, 4]
+
+
+def test_entry_computed_across_an_invalidation_is_never_served(backend):
+    cache = Cache(backend, default_ttl=60)
+
+    def compute():
+        cache.invalidate('products')  # a write commits while the value is built
+        return 'stale'
+
+    assert cache.remember_json('products', 'all', compute) == 'stale'
+    assert cache.remember_json('products', 'all', lambda: 'fresh') == 'fresh'
+
+
+def test_commit_invalidates_the_models_namespaces(app):
+    cache = app.extensions['cache']
+    products, suppliers = cache.generation('products'), cache.generation('suppliers')
+
+    db.session.add(Product(name='Stapler', price=4.5))
+    db.session.flush()
+    assert cache.generation('products') == products  # not before the commit
+    db.session.commit()
+    assert cache.generation('products') == products + 1
+    assert cache.generation('suppliers') == suppliers
+
+    db.session.add(Supplier(name='Acme'))
+    db.session.flush()
+    db.session.rollback()
+    assert cache.generation('suppliers') == suppliers
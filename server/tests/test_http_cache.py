@@ -0,0 +1,59 @@
+"""Each content coding of a response gets its own ETag, and tags sent back
+in either form still match the resource."""
+import pytest
+
+from models import db, Product, Requisition, RequisitionStatus
+from tests.conftest import auth_headers, make_user
+
+
+@pytest.fixture
+def catalogue(app):
+    db.session.add_all(Product(name=f'Product {i}', price=i, description='A4 paper, 80 gsm')
+                       for i in range(60))
+    db.session.commit()
+
+
+def test_every_coding_has_its_own_etag(client, catalogue):
+    tags = {}
+    for coding in ('identity', 'gzip', 'br', 'zstd'):
+        resp = client.get('/products', headers={'Accept-Encoding': coding})
+        assert resp.status_code == 200
+        assert resp.headers.get('Content-Encoding', 'identity') == coding
+        tags[coding] = resp.headers['ETag']
+
+    assert len(set(tags.values())) == 4
+    assert tags['gzip'] == tags['identity'][:-1] + '-gzip"'
+
+
+def test_if_none_match_accepts_any_coding_of_the_current_body(client, catalogue):
+    gzip_tag = client.get('/products', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+
+    resp = client.get('/products', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzip_tag})
+    assert resp.status_code == 304
+    assert resp.headers['ETag'] == gzip_tag
+
+    db.session.add(Product(name='Stapler', price=4.5))
+    db.session.commit()
+    resp = client.get('/products', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzip_tag})
+    assert resp.status_code == 200
+
+
+def test_if_match_takes_the_version_of_a_compressed_etag(app, client):
+    app.config['COMPRESS_MIN_BYTES'] = 0
+    admin = make_user('admin', 'Ada Admin')
+    req = Requisition(user_id=admin.id, status=RequisitionStatus.PENDING, notes='')
+    db.session.add(req)
+    db.session.commit()
+    headers = auth_headers(admin)
+
+    resp = client.get(f'/requisitions/{req.id}', headers={**headers, 'Accept-Encoding': 'gzip'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    tag = resp.headers['ETag']
+    assert tag.endswith('-gzip"')
+
+    resp = client.put(f'/requisitions/{req.id}', json={'status': 'approved'},
+                      headers={**headers, 'If-Match': tag})
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    resp = client.put(f'/requisitions/{req.id}', json={'status': 'rejected'},
+                      headers={**headers, 'If-Match': tag})
+    assert resp.status_code == 412
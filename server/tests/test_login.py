@@ -0,0 +1,29 @@
+"""Passwords are always stored hashed, and login sheds load with 503 +
+Retry-After instead of failing with 500."""
+from werkzeug.security import generate_password_hash
+
+from models import db, User
+
+
+def test_slow_password_check_answers_503(app, client):
+    # a deliberately slow hash, and no time to wait for it
+    db.session.add(User(name='Slow Hash', email='slow@example.com', role='user',
+                        password_hash=generate_password_hash('secret', 'scrypt:65536:8:1')))
+    db.session.commit()
+    app.config['LOGIN_HASH_TIMEOUT'] = 0
+
+    resp = client.post('/login', json={'email': 'slow@example.com', 'password': 'secret'})
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After'] == '1'
+
+
+def test_password_that_looks_like_a_hash_is_hashed(app, client):
+    for n, password in enumerate(['pbkdf2:a$b$c', 'scrypt:1:1$salt$' + 'f' * 64]):
+        email = f'tricky{n}@example.com'
+        db.session.add(User(name='Tricky', email=email, role='user', password_hash=password))
+        db.session.commit()
+        stored = User.query.filter_by(email=email).one().password_hash
+        assert stored != password and stored.startswith('pbkdf2:sha256:1$')
+
+        resp = client.post('/login', json={'email': email, 'password': password})
+        assert resp.status_code == 200
@@ -0,0 +1,51 @@
+"""GET /requisitions runs a fixed number of SQL statements however many rows
+it returns; a per-row query (N+1) shows up as a count that grows with them."""
+from sqlalchemy import event, insert
+
+from models import db, Product, Requisition, RequisitionProduct, RequisitionStatus
+from tests.conftest import auth_headers, make_user
+
+MAX_STATEMENTS = 5  # revoked token, principal, requisitions, line items, products
+
+
+def add_requisitions(user, products, count):
+    for _ in range(count):
+        req = Requisition(user_id=user.id, status=RequisitionStatus.PENDING, notes='paper')
+        db.session.add(req)
+        db.session.flush()
+        db.session.execute(insert(RequisitionProduct.__table__), [
+            {'requisition_id': req.id, 'product_id': p.id, 'quantity': 2} for p in products])
+    db.session.commit()
+
+
+def statements_for(app, client, path, headers):
+    app.extensions['cache'].backend.clear()  # measure the query path, not a cache hit
+    seen = []
+
+    def count(conn, cursor, statement, *args):
+        seen.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        resp = client.get(path, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    return len(resp.json), seen
+
+
+def test_requisition_list_statements_do_not_grow_with_rows(app, client):
+    admin = make_user('admin', 'Ada Admin')
+    requester = make_user('user', 'Uma User')
+    products = [Product(name=f'Product {i}', price=1.5 * i) for i in range(1, 4)]
+    db.session.add_all(products)
+    db.session.commit()
+
+    add_requisitions(requester, products, 3)
+    small_rows, small = statements_for(app, client, '/requisitions', auth_headers(admin))
+    add_requisitions(requester, products, 120)
+    large_rows, large = statements_for(app, client, '/requisitions', auth_headers(admin))
+
+    assert (small_rows, large_rows) == (3, 123)
+    assert len(small) == len(large), large
+    assert len(large) <= MAX_STATEMENTS, large
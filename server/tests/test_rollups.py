@@ -0,0 +1,46 @@
+"""The spend rollups follow LPO writes through the API and match a full
+recomputation afterwards."""
+from sqlalchemy.dialects import mysql
+
+from models import db, Product, Supplier, SupplierSpend
+from rollups import _upsert, check, spend_by_status
+from tests.conftest import auth_headers, make_user
+
+
+def test_rollups_follow_lpo_writes(app, client):
+    admin, requester = make_user('admin', 'Ada Admin'), make_user('user', 'Uma User')
+    products = [Product(name='Paper', price=5.0), Product(name='Toner', price=40.0)]
+    supplier = Supplier(name='Acme')
+    db.session.add_all([*products, supplier])
+    db.session.commit()
+    admin_h = auth_headers(admin)
+
+    lpo_ids = []
+    for _ in range(2):
+        rid = client.post('/requisitions', headers=auth_headers(requester), json={
+            'items': [{'product_id': p.id, 'quantity': 2} for p in products]}).json['id']
+        client.put(f'/requisitions/{rid}', json={'status': 'approved'}, headers=admin_h)
+        resp = client.post('/lpos', json={'requisition_id': rid, 'supplier_id': supplier.id},
+                           headers=admin_h)
+        assert resp.status_code == 201
+        lpo_ids.append(resp.json['id'])
+
+    resp = client.put(f'/lpos/{lpo_ids[0]}', headers=admin_h, json={
+        'status': 'delivered', 'prices': {str(products[0].id): 6.0}})
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+
+    connection = db.session.connection()
+    assert check(connection) == []
+    assert spend_by_status(connection) == {
+        'pending': {'count': 1, 'total_value': 90.0},
+        'delivered': {'count': 1, 'total_value': 92.0},
+    }
+
+
+def test_mysql_upsert_adds_to_existing_buckets():
+    table = SupplierSpend.__table__
+    rows = [{'supplier_id': 1, 'month': '2024-01', 'status': 'pending',
+             'lpo_count': 1, 'total_value': 2.0}]
+    sql = str(_upsert('mysql', table, rows, ['supplier_id', 'month', 'status'],
+                      ['lpo_count', 'total_value']).compile(dialect=mysql.dialect()))
+    assert 'ON DUPLICATE KEY UPDATE lpo_count = (supplier_spend.lpo_count + VALUES(lpo_count))' in sql
@@ -0,0 +1,31 @@
+"""POST /seed validates bulk options against bulk_seed()'s own keyword
+defaults and runs the generator as a job."""
+import pytest
+
+from jobs import BULK_SEED_OPTIONS, Worker, parse_bulk_seed_options
+from models import db, Job, Requisition
+from seed import BULK_SEED_DEFAULTS
+from tests.conftest import auth_headers, make_user
+
+
+def test_options_are_bulk_seeds_numeric_keywords():
+    assert BULK_SEED_OPTIONS == {name: type(BULK_SEED_DEFAULTS[name]) for name in (
+        'users', 'products', 'suppliers', 'requisitions', 'max_lines', 'approved_ratio',
+        'lpo_ratio', 'batch_size', 'admins', 'seed')}
+    for bad in ({'workers': 2}, {'requisitions': -1}, {'lpo_ratio': 2.0}, {'batch_size': 0}):
+        with pytest.raises(ValueError):
+            parse_bulk_seed_options(bad)
+
+
+def test_bulk_seed_job(app, client):
+    admin = make_user('admin', 'Ada Admin')
+    resp = client.post('/seed', headers=auth_headers(admin), json={
+        'users': 3, 'products': 2, 'suppliers': 2, 'requisitions': 12, 'batch_size': 5})
+    assert resp.status_code == 202
+
+    Worker(app, log=lambda msg: None).run(once=True)
+    db.session.expire_all()
+    job = db.session.get(Job, resp.json['job_id'])
+    assert job.status.value == 'succeeded', job.error
+    assert job.result['requisitions'] == 12
+    assert Requisition.query.count() == 12
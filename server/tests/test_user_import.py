@@ -0,0 +1,30 @@
+"""POST /users/import queues password hashes only; the job inserts the users
+and their first login upgrades the cheap import hash."""
+from jobs import Worker
+from models import db, Job, User
+from tests.conftest import auth_headers, make_user
+
+
+def test_import_queues_no_plain_text_passwords(app, client):
+    admin = make_user('admin', 'Ada Admin')
+    rows = [{'name': f'User {i}', 'email': f'user{i}@example.com', 'password': f'hunter-{i}'}
+            for i in range(20)]
+    rows.append({'name': 'No Password', 'email': 'nopw@example.com'})
+
+    resp = client.post('/users/import', json=rows, headers=auth_headers(admin))
+    assert resp.status_code == 202
+    job = db.session.get(Job, resp.json['job_id'])
+    assert 'hunter-' not in repr(job.params)
+    assert all(r['password_hash'].startswith('pbkdf2:sha256:1000$') for r in job.params['rows'][:20])
+
+    Worker(app, log=lambda msg: None).run(once=True)
+    db.session.expire_all()
+    job = db.session.get(Job, job.id)
+    assert job.result == {'created': 20, 'errors': [{'row': 21, 'error': 'password is required'}]}
+    assert job.params == {'rows': 21}
+
+    resp = client.post('/login', json={'email': 'user7@example.com', 'password': 'hunter-7'})
+    assert resp.status_code == 200
+    db.session.expire_all()
+    upgraded = User.query.filter_by(email='user7@example.com').one().password_hash
+    assert upgraded.startswith('pbkdf2:sha256:1$')  # the test config's PASSWORD_HASH_METHOD
@@ -0,0 +1,119 @@
+import csv
+import io
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, normalize_email
+from security import hash_passwords, is_password_hash
+
+MAX_IMPORT_ROWS = 10_000
+BATCH_SIZE = 500
+FIELDS = ('name', 'email', 'role')
+REQUIRED = {'name': 'name', 'email': 'email', 'password_hash': 'password'}
+
+
+def parse_user_rows(request):
+    """Rows from a JSON array ({"users": [...]} also works) or a CSV body/upload."""
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+    elif request.is_json:
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = data.get('users')
+        if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+            raise ValueError('Expected a JSON array of users')
+        return data
+    else:
+        text = request.get_data(as_text=True)
+
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {'name', 'email', 'password'} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+    return list(reader)
+
+
+def job_rows(rows):
+    """The rows as import_user_rows() takes them: string fields and a password_hash.
+
+    Runs in the request, so plain-text passwords never reach the jobs table.
+    They are hashed with the cheap IMPORT_HASH_METHOD (the login upgrade
+    replaces it on first sign-in); values already in werkzeug's hash format
+    are kept as they are.
+    """
+    out = [{f: str(row[f]) for f in FIELDS if row.get(f) is not None} for row in rows]
+    passwords = [str(row['password']) if row.get('password') else None for row in rows]
+    plain = [i for i, pw in enumerate(passwords) if pw and not is_password_hash(pw)]
+    hashes = hash_passwords([passwords[i] for i in plain],
+                            method=current_app.config.get('IMPORT_HASH_METHOD'))
+    for i, pwhash in zip(plain, hashes):
+        passwords[i] = pwhash
+    for row, pwhash in zip(out, passwords):
+        if pwhash:
+            row['password_hash'] = pwhash
+    return out
+
+
+def _validate(rows):
+    """Split rows into insertable dicts and per-row errors (1-based row numbers)."""
+    valid, errors, seen = [], [], set()
+    for n, row in enumerate(rows, start=1):
+        missing = [label for f, label in REQUIRED.items() if not row.get(f)]
+        if missing:
+            errors.append({'row': n, 'error': f"{missing[0]} is required"})
+            continue
+        try:
+            email = normalize_email(row['email'])
+        except ValueError as e:
+            errors.append({'row': n, 'error': str(e)})
+            continue
+        if email in seen:
+            errors.append({'row': n, 'email': email, 'error': 'Duplicate email in import'})
+            continue
+        seen.add(email)
+        valid.append((n, {
+            'name': row['name'],
+            'email': email,
+            'password_hash': row['password_hash'],
+            'role': row.get('role') or 'user',
+        }))
+    return valid, errors
+
+
+def import_user_rows(rows, progress=None):
+    """Insert users in batches of executemany INSERTs; runs as a background job.
+
+    Like create_user there is no SELECT for duplicates: each batch goes in
+    as one statement and the unique email index rejects clashes. Only a batch
+    that hits one is retried row by row (in savepoints) to find the culprits.
+    `rows` come from job_rows(), passwords already hashed; `progress(done,
+    total)` is called after every committed batch.
+    """
+    valid, errors = _validate(rows)
+
+    created = 0
+    table = User.__table__
+    for lo in range(0, len(valid), BATCH_SIZE):
+        batch = valid[lo:lo + BATCH_SIZE]
+        try:
+            db.session.execute(insert(table), [r for _, r in batch])
+            db.session.commit()
+            created += len(batch)
+        except IntegrityError:
+            db.session.rollback()
+            for n, r in batch:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(table), [r])
+                    created += 1
+                except IntegrityError:
+                    errors.append({'row': n, 'email': r['email'], 'error': 'Email already in use'})
+            db.session.commit()
+        if progress:
+            progress(lo + len(batch), len(valid))
+
+    errors.sort(key=lambda e: e['row'])
+    return created, errors